@@ -0,0 +1,259 @@
+"""
+SmartCart AI - Approximate Nearest-Neighbor Index
+IVF-flat index over the product embeddings (pure NumPy), built offline into the models directory
+
+Vectors are clustered with spherical k-means; each cluster (inverted list)
+stores its unit-length vectors contiguously. A query is compared with the
+centroids, and only the `nprobe` closest lists are scanned exactly. More
+lists make each probe cheaper, more probes raise recall.
+
+Index layout (a directory next to the embeddings, e.g. text_embeddings.ivf/):
+    centroids.npy       float32 (n_lists, dim), unit length
+    list_offsets.npy    int64 (n_lists + 1), list i is rows list_offsets[i]:list_offsets[i + 1]
+    list_rows.npy       int64 (n), embedding row of every stored vector
+    vectors.npy         float32 (n, dim), unit-length vectors in list order
+    params.json         build parameters, including the version of the
+                        embeddings indexed (see embedding_store.embeddings_version)
+
+The index is written to a temporary directory that replaces the previous
+one, so a server with the old index mapped keeps searching it unchanged.
+
+Usage (from backend/):
+    python ann_index.py [--lists N] [--sample N] [--iterations N]    # index SMARTCART_EMBEDDINGS_FILE
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from embedding_store import (
+    EMBEDDINGS_FILE, MODELS_DIR, embeddings_version, read_params, replace_directory, top_k
+)
+
+# Default number of inverted lists probed per query
+DEFAULT_NPROBE = int(os.environ.get("SMARTCART_ANN_NPROBE", "16"))
+
+# Rows processed at a time while assigning vectors to lists
+ASSIGN_CHUNK_ROWS = 65536
+
+
+def index_path(models_dir: str, filename: str) -> str:
+    """Directory holding the IVF index for an embeddings file"""
+    return os.path.join(models_dir, os.path.splitext(filename)[0] + ".ivf")
+
+
+def default_n_lists(n: int) -> int:
+    """Number of lists for n vectors (about sqrt(n), at least 1)"""
+    return max(1, int(round(np.sqrt(n))))
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray,
+             chunk_rows: int = ASSIGN_CHUNK_ROWS) -> np.ndarray:
+    """Closest centroid (highest cosine) of every vector, normalized in chunks"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = _normalized(vectors[start:start + chunk_rows])
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+def train_centroids(sample: np.ndarray, n_lists: int, iterations: int = 10,
+                    seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over a sample of unit vectors
+
+    Empty clusters are reseeded with random sample vectors.
+    """
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(sample))
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_lists)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        occupied = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[occupied] = np.add.reduceat(sample[order], starts[occupied], axis=0)
+        empty = np.flatnonzero(~occupied)
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalized(sums)
+    return centroids
+
+
+def build_ivf_index(
+    embeddings: np.ndarray,
+    path: str,
+    n_lists: Optional[int] = None,
+    sample_size: int = 100_000,
+    iterations: int = 10,
+    seed: int = 0,
+    version: Optional[str] = None
+) -> "IVFIndex":
+    """
+    Build an IVF-flat index and write it to a directory
+
+    Args:
+        embeddings: (n, dim) embedding matrix (may be a memory map)
+        path: Output directory
+        n_lists: Number of inverted lists (default: about sqrt(n))
+        sample_size: Vectors used to train the centroids
+        iterations: k-means iterations
+        seed: Random seed for sampling and initialization
+        version: Content version of the embeddings, recorded in params.json
+    """
+    n = len(embeddings)
+    if n_lists is None:
+        n_lists = default_n_lists(n)
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(n, min(sample_size, n), replace=False))
+    centroids = train_centroids(_normalized(embeddings[sample_rows]), n_lists, iterations, seed)
+
+    assignment = _nearest(embeddings, centroids)
+    list_rows = np.argsort(assignment, kind="stable").astype(np.int64)
+    list_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=list_offsets[1:])
+
+    def write(directory: str):
+        np.save(os.path.join(directory, "centroids.npy"), centroids)
+        np.save(os.path.join(directory, "list_offsets.npy"), list_offsets)
+        np.save(os.path.join(directory, "list_rows.npy"), list_rows)
+        vectors = np.lib.format.open_memmap(
+            os.path.join(directory, "vectors.npy"), mode="w+", dtype=np.float32,
+            shape=(n, embeddings.shape[1])
+        )
+        for start in range(0, n, ASSIGN_CHUNK_ROWS):
+            rows = list_rows[start:start + ASSIGN_CHUNK_ROWS]
+            vectors[start:start + len(rows)] = _normalized(embeddings[rows])
+        vectors.flush()
+        del vectors
+
+        with open(os.path.join(directory, "params.json"), "w") as f:
+            json.dump({
+                "n_vectors": n,
+                "dim": int(embeddings.shape[1]),
+                "n_lists": len(centroids),
+                "sample_size": len(sample_rows),
+                "iterations": iterations,
+                "seed": seed,
+                "embeddings_version": version,
+            }, f, indent=2)
+
+    replace_directory(path, write)
+    return IVFIndex.load(path)
+
+
+class IVFIndex:
+    """
+    Inverted-file index with exact scoring inside the probed lists.
+
+    Arrays are memory-mapped read-only, so worker processes share them.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray,
+                 list_rows: np.ndarray, vectors: np.ndarray, params: Optional[dict] = None):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.vectors = vectors
+        self.params = params or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Open an index directory"""
+        def load(name, mmap_mode="r"):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+        return cls(load("centroids.npy", None), load("list_offsets.npy", None),
+                   load("list_rows.npy"), load("vectors.npy"),
+                   read_params(os.path.join(path, "params.json")))
+
+    def __len__(self) -> int:
+        return len(self.list_rows)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    def search(self, query: np.ndarray, k: int,
+               nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k search for one unit-length query vector
+
+        Args:
+            query: (dim,) unit vector
+            k: Number of results
+            nprobe: Inverted lists scanned (n_lists for an exact search)
+
+        Returns:
+            (embedding rows, cosine scores), best first
+        """
+        probes = top_k(self.centroids @ query, nprobe)
+        starts = self.list_offsets[probes]
+        ends = self.list_offsets[probes + 1]
+        blocks = [(start, end) for start, end in zip(starts.tolist(), ends.tolist()) if end > start]
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Score each list in place (lists are contiguous), copying only scores
+        scores = np.concatenate([self.vectors[start:end] @ query for start, end in blocks])
+        positions = np.concatenate([np.arange(start, end) for start, end in blocks])
+        best = top_k(scores, k)
+        return np.asarray(self.list_rows[positions[best]]), scores[best]
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k for each unit-length query: (rows, scores), shape (m, k)"""
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for index, query in enumerate(queries):
+            found_rows, found_scores = self.search(query, k, nprobe)
+            rows[index, :len(found_rows)] = found_rows
+            scores[index, :len(found_scores)] = found_scores
+        return rows, scores
+
+
+def load_ivf_index(models_dir: str = MODELS_DIR,
+                   filename: str = EMBEDDINGS_FILE) -> Optional[IVFIndex]:
+    """The IVF index built for an embeddings file, or None if there is none"""
+    path = index_path(models_dir, filename)
+    if not os.path.exists(os.path.join(path, "params.json")):
+        return None
+    return IVFIndex.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--embeddings", default=EMBEDDINGS_FILE)
+    parser.add_argument("--lists", type=int, default=None, help="inverted lists (default ~sqrt(n))")
+    parser.add_argument("--sample", type=int, default=100_000, help="k-means training sample")
+    parser.add_argument("--iterations", type=int, default=10, help="k-means iterations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = np.load(os.path.join(args.models_dir, args.embeddings), mmap_mode="r")
+    path = index_path(args.models_dir, args.embeddings)
+    start = time.perf_counter()
+    index = build_ivf_index(embeddings, path, args.lists, args.sample, args.iterations, args.seed,
+                            embeddings_version(args.models_dir, args.embeddings))
+    print(f"Indexed {len(index)} vectors into {index.n_lists} lists at {path} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
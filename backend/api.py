@@ -3,14 +3,45 @@ SmartCart AI - FastAPI Backend
 Lightweight API for product recommendations and analytics
 """
 
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import base64
+import json
+import math
+import os
+import secrets
+import threading
+import warnings
 import products_data
-from collections import Counter
+from catalog_store import PRICES_SUFFIX, MappedCatalog, catalog_fingerprint, write_prices
+from search_index import InvertedIndex
+from vector_scorer import VectorScorer
+from filter_index import FilterIndex
+from catalog_analytics import CatalogAnalytics
+from response_cache import ResponseCache
+from json_fragments import FragmentCache, dumps
+from embedding_store import EmbeddingStore, TextEncoder, load_embedding_store
+from similar_products import (
+    SOURCE_NAMES, SOURCE_ATTRIBUTES, AttributeSimilarity,
+    SimilarityTable, load_similarity_table
+)
+import heapq
+import numpy as np
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Watch the catalog source for changes while the app is served"""
+    stop = threading.Event()
+    if products_data.CATALOG_PATH and CATALOG_POLL_INTERVAL > 0:
+        threading.Thread(target=watch_catalog_source, args=(stop,), daemon=True).start()
+    yield
+    stop.set()
 
-app = FastAPI(title="SmartCart AI API", version="1.0.0")
+app = FastAPI(title="SmartCart AI API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration for frontend access
 # Allow both local development and production frontend URLs
@@ -29,6 +60,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Relevance scoring backend: "index" (inverted index), "numpy" (vectorized)
+# or "python" (calculate_relevance_score over every product)
+SCORING_BACKEND = os.environ.get("SMARTCART_SCORING_BACKEND", "index")
+
+# /api/recommend result cache: capacity (0 disables) and time to live in seconds
+RECOMMEND_CACHE_SIZE = int(os.environ.get("SMARTCART_RECOMMEND_CACHE_SIZE", "1024"))
+RECOMMEND_CACHE_TTL = float(os.environ.get("SMARTCART_RECOMMEND_CACHE_TTL", "300"))
+
+# Ranked result snapshots kept for cursor pagination, and their lifetime in seconds
+CURSOR_SNAPSHOT_CACHE_SIZE = int(os.environ.get("SMARTCART_CURSOR_SNAPSHOT_CACHE_SIZE", "256"))
+CURSOR_SNAPSHOT_TTL = float(os.environ.get("SMARTCART_CURSOR_SNAPSHOT_TTL", "900"))
+
 # Response models
 class Product(BaseModel):
     id: int
@@ -46,6 +89,40 @@ class RecommendationResponse(BaseModel):
     products: List[Product]
     total: int
     query: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+class BatchGetRequest(BaseModel):
+    ids: List[int]
+
+class BatchGetResponse(BaseModel):
+    products: List[Product]
+    missing: List[int]
+
+class SemanticSearchRequest(BaseModel):
+    query: Optional[str] = None
+    vector: Optional[List[float]] = None
+    limit: int = 20
+
+class ScoredProduct(BaseModel):
+    product: Product
+    score: float
+
+class SemanticSearchResponse(BaseModel):
+    results: List[ScoredProduct]
+    query: Optional[str] = None
+
+class SimilarProductsResponse(BaseModel):
+    product_id: int
+    source: str
+    results: List[ScoredProduct]
+
+class PriceUpdateRequest(BaseModel):
+    prices: Dict[int, float]
+
+class CatalogUpdateResponse(BaseModel):
+    version: int
+    products_loaded: int
+    missing: List[int] = []
 
 class AnalyticsResponse(BaseModel):
     total_products: int
@@ -68,6 +145,11 @@ async def root():
         "endpoints": {
             "health": "/api/health",
             "recommend": "/api/recommend",
+            "product": "/api/products/{id}",
+            "stream": "/api/products/stream",
+            "batch_get": "/api/products:batchGet",
+            "similar": "/api/products/{id}/similar",
+            "semantic_search": "/api/semantic-search",
             "analytics": "/api/analytics"
         }
     }
@@ -75,15 +157,21 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    products = products_data.get_all_products()
+    snapshot = catalog_snapshot
     return {
         "status": "healthy",
-        "products_loaded": len(products),
+        "products_loaded": len(snapshot.catalog),
         "categories": len(products_data.get_categories()),
-        "brands": len(products_data.get_brands())
+        "brands": len(products_data.get_brands()),
+        "recommend_cache": recommend_cache.stats()
     }
 
-def calculate_relevance_score(product: dict, query: str, filters: dict) -> float:
+def calculate_relevance_score(
+    product: dict,
+    query: str,
+    filters: dict,
+    normalized: Optional[dict] = None
+) -> float:
     """
     Calculate relevance score for product recommendations
     Scoring system:
@@ -96,44 +184,314 @@ def calculate_relevance_score(product: dict, query: str, filters: dict) -> float
     if not query:
         return 5.0  # Base score for no query
     
+    # Lowercased fields are precomputed once per product in products_data
+    if normalized is None:
+        normalized = products_data.get_normalized_product(product['id'])
+    if normalized is None:
+        normalized = products_data.normalize_product(product)
+    
     score = 0.0
     query_lower = query.lower()
     query_words = query_lower.split()
     
     # Title matching
-    title_lower = product['title'].lower()
+    title_lower = normalized['title']
     for word in query_words:
         if word in title_lower:
             score += 3.0
     
     # Description matching
-    desc_lower = product['description'].lower()
+    desc_lower = normalized['description']
     for word in query_words:
         if word in desc_lower:
             score += 2.0
     
     # Category matching
-    for category in product['categories']:
-        if query_lower in category.lower():
+    for category_lower in normalized['categories']:
+        if query_lower in category_lower:
             score += 2.0
     
     # Brand matching
-    if query_lower in product['brand'].lower():
+    if query_lower in normalized['brand']:
         score += 1.0
     
     # Features matching
-    for feature in product['features']:
-        feature_lower = feature.lower()
+    for feature_lower in normalized['features']:
         for word in query_words:
             if word in feature_lower:
                 score += 1.0
     
     # Specifications matching
-    if query_lower in product['specifications'].lower():
+    if query_lower in normalized['specifications']:
         score += 1.0
     
     return score
 
+class LinearScorer:
+    """Reference scorer: calculate_relevance_score over every product"""
+    
+    def __init__(self, products: List[dict], normalized: List[dict]):
+        self.products = products
+        self.normalized = normalized
+    
+    def search(self, query: str) -> Dict[int, float]:
+        scores = {}
+        for position, product in enumerate(self.products):
+            score = calculate_relevance_score(product, query, {}, self.normalized[position])
+            if score > 0:  # Only include products with some relevance
+                scores[position] = score
+        return scores
+
+def build_scorer(backend: str, products: List[dict], normalized: List[dict]):
+    """Build the relevance scorer for the configured backend"""
+    if backend == "index":
+        return InvertedIndex(products, normalized)
+    if backend == "numpy":
+        return VectorScorer(products, normalized)
+    if backend == "python":
+        return LinearScorer(products, normalized)
+    raise ValueError(f"Unknown scoring backend: {backend!r}")
+
+class CatalogSnapshot:
+    """
+    A published catalog plus the search indexes and analytics built from it.
+    
+    The current snapshot is replaced with a single reference swap, and each
+    request takes it once, so a response never mixes data from two catalog
+    versions. Snapshots are fully built before they are published.
+    """
+    
+    def __init__(
+        self,
+        catalog: products_data.Catalog,
+        analytics: CatalogAnalytics,
+        scorer=None,
+        filter_index: Optional[FilterIndex] = None
+    ):
+        self.catalog = catalog
+        self.analytics = analytics
+        self.scorer = scorer
+        self.filter_index = filter_index
+    
+    @property
+    def version(self) -> int:
+        return self.catalog.version
+    
+    def indexes(self):
+        """(relevance scorer, filter index), built if missing"""
+        if self.scorer is None:
+            self.scorer = build_scorer(SCORING_BACKEND, self.catalog.products, self.catalog.normalized)
+        if self.filter_index is None:
+            self.filter_index = FilterIndex(self.catalog.products)
+        return self.scorer, self.filter_index
+
+def build_catalog_snapshot(catalog: products_data.Catalog, scorer=None,
+                           analytics: Optional[CatalogAnalytics] = None) -> CatalogSnapshot:
+    """Build every index and aggregate for a catalog ahead of publishing it"""
+    if analytics is None:
+        analytics = CatalogAnalytics(catalog.products)
+    snapshot = CatalogSnapshot(catalog, analytics, scorer)
+    snapshot.indexes()
+    return snapshot
+
+# Maximum number of IDs per batch lookup
+MAX_BATCH_GET_IDS = 1000
+
+# Products serialized per chunk of the NDJSON export stream
+STREAM_CHUNK_SIZE = 500
+
+# Admin endpoints (catalog reload, price updates) require this token in the
+# X-Admin-Token header; they are disabled when it is not set
+ADMIN_TOKEN = os.environ.get("SMARTCART_ADMIN_TOKEN")
+
+# Seconds between checks of SMARTCART_CATALOG_PATH for a new file (0 disables).
+# Every worker process reloads the catalog when the file is replaced, which
+# is how price updates and reloads reach all of them.
+CATALOG_POLL_INTERVAL = float(os.environ.get("SMARTCART_CATALOG_POLL_INTERVAL", "2"))
+
+def apply_catalog_change(old_product: Optional[dict], new_product: Optional[dict]):
+    """Publish the snapshot for an incremental catalog change (see products_data.subscribe)"""
+    global catalog_snapshot
+    previous = catalog_snapshot
+    catalog = products_data.get_catalog()
+    if previous.version == catalog.version - 1:
+        analytics = previous.analytics.copy()
+        analytics.apply(old_product, new_product)
+    else:
+        analytics = None
+    catalog_snapshot = build_catalog_snapshot(catalog, analytics=analytics)
+
+# Search indexes and analytics are built before a snapshot is published;
+# incremental changes update a copy of the analytics aggregate
+catalog_snapshot = build_catalog_snapshot(products_data.get_catalog())
+products_data.subscribe(apply_catalog_change)
+
+# Recommendation results keyed on normalized query + filters
+recommend_cache = ResponseCache(RECOMMEND_CACHE_SIZE, RECOMMEND_CACHE_TTL)
+
+# Ranked catalog positions behind pagination cursors, keyed on (request key,
+# catalog version) so a snapshot outlives catalog changes until it expires
+cursor_snapshots = ResponseCache(CURSOR_SNAPSHOT_CACHE_SIZE, CURSOR_SNAPSHOT_TTL)
+
+# Product JSON serialized once per catalog version
+product_fragments = FragmentCache(Product)
+
+def json_response(*fields: Tuple[str, bytes]) -> Response:
+    """
+    Assemble a JSON object from pre-serialized field values
+    
+    Returning a Response skips response_model validation; the declared
+    response_model still documents the shape in the OpenAPI schema.
+    """
+    body = b"{" + b",".join(dumps(name) + b":" + value for name, value in fields) + b"}"
+    return Response(content=body, media_type="application/json")
+
+def rank_products(
+    query: Optional[str],
+    category: Optional[str],
+    brand: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    limit: Optional[int],
+    snapshot: CatalogSnapshot
+) -> Tuple[np.ndarray, int]:
+    """
+    Score, filter and rank products without decoding them
+    
+    Returns:
+        (catalog positions of the top `limit` products, or of all of them
+        when limit is None, total number of matching products)
+    """
+    scorer, filter_index = snapshot.indexes()
+    ratings = filter_index.ratings
+    
+    # Category/brand bitmaps plus price/rating binary searches
+    filter_mask = filter_index.filter(category, brand, min_price, max_price, min_rating)
+    
+    # Calculate relevance scores if query provided
+    if query:
+        # Only products sharing a token with the query can score above zero
+        scores = scorer.search(query)
+        positions = filter_index.accepts(filter_mask, list(scores))
+        total = len(positions)
+        
+        # Select the top results by score (descending) and rating (descending)
+        # with a bounded heap instead of sorting every match; remaining ties
+        # keep catalog order
+        if limit is None:
+            count = total
+        else:
+            count = limit if limit >= 0 else max(total + limit, 0)
+        top_positions = heapq.nlargest(
+            count,
+            positions,
+            key=lambda position: (scores[position], ratings[position], -position)
+        )
+        return np.array(top_positions, dtype=np.int64), total
+    
+    # Filter index slots are already sorted by rating
+    return filter_index.top_by_rating(
+        filter_mask, len(filter_index) if limit is None else limit
+    )
+
+def find_recommendations(
+    query: Optional[str],
+    category: Optional[str],
+    brand: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    limit: Optional[int],
+    snapshot: Optional[CatalogSnapshot] = None
+) -> Tuple[List[dict], int]:
+    """
+    Score, filter and rank products
+    
+    Args:
+        snapshot: Catalog snapshot to search (default: the current one)
+    
+    Returns:
+        (top `limit` products, or all of them ranked when limit is None,
+        total number of matching products)
+    """
+    if snapshot is None:
+        snapshot = catalog_snapshot
+    positions, total = rank_products(
+        query, category, brand, min_price, max_price, min_rating, limit, snapshot
+    )
+    products = snapshot.catalog.products
+    return [products[position] for position in positions.tolist()], total
+
+def recommend_request_key(
+    query: Optional[str],
+    category: Optional[str],
+    brand: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float]
+) -> tuple:
+    """
+    Normalized identity of a recommendation request
+    
+    Scoring is case-insensitive and empty filters are ignored, so equivalent
+    requests share cache entries and snapshots.
+    """
+    return (
+        query.lower() if query else None,
+        category or None,
+        brand or None,
+        min_price,
+        max_price,
+        min_rating
+    )
+
+def encode_cursor(request: tuple, version: int, offset: int) -> str:
+    """Opaque pagination cursor: request parameters, catalog version and offset"""
+    payload = json.dumps([list(request), version, offset], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[tuple, int, int]:
+    """Inverse of encode_cursor; raises HTTP 400 for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        request, version, offset = json.loads(base64.urlsafe_b64decode(padded))
+        query, category, brand, min_price, max_price, min_rating = request
+        if not all(value is None or isinstance(value, str) for value in (query, category, brand)):
+            raise ValueError(cursor)
+        if not all(value is None or isinstance(value, (int, float))
+                   for value in (min_price, max_price, min_rating)):
+            raise ValueError(cursor)
+        if not isinstance(version, int) or not isinstance(offset, int) or offset < 0:
+            raise ValueError(cursor)
+        return (query, category, brand, min_price, max_price, min_rating), version, offset
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def ranked_snapshot(request_key: tuple, version: int,
+                    catalog: CatalogSnapshot) -> Tuple[products_data.Catalog, np.ndarray, int]:
+    """
+    Every matching product for a request, in ranked order
+    
+    Snapshots hold catalog positions (not products) and are computed once
+    and cached, so following pages decode only their own slice. If the
+    snapshot for an older catalog version has expired, the given (current)
+    catalog snapshot is ranked instead.
+    
+    Returns:
+        (catalog the positions refer to, ranked positions, catalog version
+        of the snapshot)
+    """
+    snapshot = cursor_snapshots.get((request_key, version), None)
+    if snapshot is None:
+        version = catalog.version
+        snapshot = cursor_snapshots.get((request_key, version), None)
+        if snapshot is None:
+            positions, _ = rank_products(*request_key, None, catalog)
+            snapshot = (catalog.catalog, positions)
+            cursor_snapshots.put((request_key, version), None, snapshot)
+    return snapshot[0], snapshot[1], version
+
 @app.get("/api/recommend", response_model=RecommendationResponse)
 async def recommend_products(
     query: Optional[str] = Query(None, description="Search query"),
@@ -142,132 +500,448 @@ async def recommend_products(
     min_price: Optional[float] = Query(None, description="Minimum price"),
     max_price: Optional[float] = Query(None, description="Maximum price"),
     min_rating: Optional[float] = Query(None, description="Minimum rating"),
-    limit: int = Query(20, description="Number of results")
+    limit: int = Query(20, description="Number of results"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor")
 ):
     """
     Get product recommendations based on query and filters
+    
+    Responses include a `next_cursor` while more results remain; passing it
+    back returns the following page of the same ranking (the query and
+    filters are carried in the cursor).
     """
-    products = products_data.get_all_products()
+    snapshot = catalog_snapshot
+    version = snapshot.version
     
-    # Apply filters
-    filtered_products = []
-    for product in products:
-        # Category filter
-        if category and category not in product['categories']:
-            continue
-        
-        # Brand filter
-        if brand and product['brand'] != brand:
-            continue
-        
-        # Price filters
-        if min_price is not None and product['price'] < min_price:
-            continue
-        if max_price is not None and product['price'] > max_price:
-            continue
+    if cursor:
+        if limit <= 0:
+            raise HTTPException(status_code=400, detail="limit must be positive when paginating")
+        request, snapshot_version, offset = decode_cursor(cursor)
+        ranked_catalog, ranked, snapshot_version = ranked_snapshot(
+            recommend_request_key(*request), snapshot_version, snapshot
+        )
+        page = [ranked_catalog.products[position] for position in ranked[offset:offset + limit].tolist()]
+        total = len(ranked)
+        next_offset = offset + len(page)
+        next_cursor = encode_cursor(request, snapshot_version, next_offset) \
+            if next_offset < total else None
         
-        # Rating filter
-        if min_rating is not None and product['rating'] < min_rating:
-            continue
-        
-        filtered_products.append(product)
+        return json_response(
+            ("products", product_fragments.array(page, version)),
+            ("total", dumps(total)),
+            ("query", dumps(request[0])),
+            ("next_cursor", dumps(next_cursor))
+        )
     
-    # Calculate relevance scores if query provided
-    if query:
-        product_scores = []
-        for product in filtered_products:
-            score = calculate_relevance_score(product, query, {})
-            if score > 0:  # Only include products with some relevance
-                product_scores.append((product, score))
-        
-        # Sort by score (descending) and rating (descending)
-        product_scores.sort(key=lambda x: (x[1], x[0]['rating']), reverse=True)
-        filtered_products = [p[0] for p in product_scores]
+    request = (query, category, brand, min_price, max_price, min_rating)
+    cache_key = recommend_request_key(*request) + (limit,)
+    result = recommend_cache.get(cache_key, version)
+    if result is None:
+        result = find_recommendations(
+            query, category, brand, min_price, max_price, min_rating, limit, snapshot
+        )
+        recommend_cache.put(cache_key, version, result)
+    limited_products, total = result
+    
+    next_cursor = None
+    if 0 < len(limited_products) < total and limit > 0:
+        next_cursor = encode_cursor(request, version, len(limited_products))
+    
+    return json_response(
+        ("products", product_fragments.array(limited_products, version)),
+        ("total", dumps(total)),
+        ("query", dumps(query)),
+        ("next_cursor", dumps(next_cursor))
+    )
+
+@app.get("/api/products/stream")
+def stream_products(
+    category: Optional[str] = Query(None, description="Filter by category"),
+    brand: Optional[str] = Query(None, description="Filter by brand"),
+    min_price: Optional[float] = Query(None, description="Minimum price"),
+    max_price: Optional[float] = Query(None, description="Maximum price"),
+    min_rating: Optional[float] = Query(None, description="Minimum rating")
+):
+    """
+    Export products as newline-delimited JSON, in catalog order
+    
+    Products are serialized lazily in small chunks, so memory use stays
+    constant and a slow client throttles the export instead of buffering it.
+    """
+    snapshot = catalog_snapshot
+    products = snapshot.catalog.products
+    _, index = snapshot.indexes()
+    version = snapshot.version
+    filter_mask = index.filter(category, brand, min_price, max_price, min_rating)
+    
+    def generate():
+        for start in range(0, len(index), STREAM_CHUNK_SIZE):
+            positions = index.accepts(
+                filter_mask, range(start, min(start + STREAM_CHUNK_SIZE, len(index)))
+            )
+            if positions:
+                yield b"".join(
+                    product_fragments.serialize(products[position], version) + b"\n"
+                    for position in positions
+                )
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/api/products/{product_id}", response_model=Product)
+async def get_product(product_id: int):
+    """Get a single product by ID"""
+    product = catalog_snapshot.catalog.get(product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+    return product
+
+@app.post("/api/products:batchGet", response_model=BatchGetResponse)
+async def batch_get_products(request: BatchGetRequest):
+    """
+    Get several products by ID in one call
+    
+    Products are returned in the requested order; unknown IDs are listed
+    in `missing`.
+    """
+    if len(request.ids) > MAX_BATCH_GET_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_GET_IDS} IDs per request"
+        )
+    
+    snapshot = catalog_snapshot
+    found = []
+    missing = []
+    for product_id in request.ids:
+        product = snapshot.catalog.get(product_id)
+        if product is None:
+            missing.append(product_id)
+        else:
+            found.append(product)
+    
+    version = snapshot.version
+    return json_response(
+        ("products", product_fragments.array(found, version)),
+        ("missing", dumps(missing))
+    )
+
+# Product embeddings (see embedding_store.py), opened on first use
+embedding_store: Optional[EmbeddingStore] = None
+text_encoder = TextEncoder()
+
+def get_embedding_store() -> EmbeddingStore:
+    """
+    The product embedding store
+    
+    HTTP 503 if no embeddings were exported, or if they were computed for
+    another catalog than the served one (checked when the store is opened,
+    which happens again after the catalog source is reloaded).
+    """
+    global embedding_store
+    if embedding_store is None:
+        try:
+            embedding_store = load_embedding_store(
+                catalog=catalog_fingerprint(catalog_snapshot.catalog.products)
+            )
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=503,
+                detail="Product embeddings not found; export them from the training notebook"
+            )
+        except ValueError as error:
+            raise HTTPException(status_code=503, detail=str(error))
+    return embedding_store
+
+@app.post("/api/semantic-search", response_model=SemanticSearchResponse)
+def semantic_search(request: SemanticSearchRequest):
+    """
+    Find products by embedding similarity
+    
+    Pass either `query` text (encoded with the configured Sentence-Transformers
+    model, which must be installed) or a precomputed query `vector`. Products
+    are ranked by cosine similarity over the whole embedding matrix.
+    """
+    if (request.query is None) == (request.vector is None):
+        raise HTTPException(status_code=400, detail="Pass either query or vector")
+    if request.limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    store = get_embedding_store()
+    
+    if request.vector is not None:
+        vector = request.vector
     else:
-        # Sort by rating if no query
-        filtered_products.sort(key=lambda x: x['rating'], reverse=True)
+        if not text_encoder.available():
+            raise HTTPException(
+                status_code=501,
+                detail="Text queries need sentence-transformers; pass a query vector instead"
+            )
+        vector = text_encoder.encode([request.query])[0]
     
-    # Limit results
-    limited_products = filtered_products[:limit]
+    snapshot = catalog_snapshot
+    k = request.limit
+    while True:
+        try:
+            ids, scores = store.search(vector, k)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        # Embeddings may include products that are no longer in the catalog
+        matches = [
+            (product, score)
+            for product, score in zip(
+                (snapshot.catalog.get(product_id) for product_id in ids.tolist()), scores.tolist()
+            )
+            if product is not None
+        ][:request.limit]
+        if len(matches) == request.limit or k >= len(store):
+            break
+        k *= 4
     
-    return {
-        "products": limited_products,
-        "total": len(filtered_products),
-        "query": query
-    }
+    return json_response(
+        ("results", scored_products_json(matches, snapshot.version)),
+        ("query", dumps(request.query))
+    )
 
-@app.get("/api/analytics", response_model=AnalyticsResponse)
-async def get_analytics():
+def scored_products_json(matches: List[Tuple[dict, float]], version: int) -> bytes:
+    """JSON array of {"product", "score"} objects built from cached fragments"""
+    return b"[" + b",".join(
+        b'{"product":' + product_fragments.fragment(product, version)
+        + b',"score":' + dumps(score) + b"}"
+        for product, score in matches
+    ) + b"]"
+
+# Precomputed neighbor lists (see similar_products.py), opened on first use
+similarity_table: Optional[SimilarityTable] = None
+similarity_table_loaded = False
+
+def get_similarity_table() -> Optional[SimilarityTable]:
+    """The precomputed neighbor table, or None if it has not been built"""
+    global similarity_table, similarity_table_loaded
+    if not similarity_table_loaded:
+        similarity_table = load_similarity_table()
+        similarity_table_loaded = True
+    return similarity_table
+
+@app.get("/api/products/{product_id}/similar", response_model=SimilarProductsResponse)
+def similar_products(product_id: int, limit: int = Query(10, description="Number of results")):
     """
-    Get analytics and statistics about the product catalog
+    Products similar to a product
+    
+    Served from the neighbor table built offline by similar_products.py:
+    embedding neighbors where the product has an embedding (`source` is
+    "embeddings"), otherwise products sharing categories, features and brand
+    ("attributes"). Products added since the table was built get attribute
+    neighbors computed on request.
     """
-    products = products_data.get_all_products()
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    snapshot = catalog_snapshot
+    catalog = snapshot.catalog
+    if catalog.get(product_id) is None:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
     
-    # Basic stats
-    total_products = len(products)
-    brands = products_data.get_brands()
-    categories = products_data.get_categories()
+    table = get_similarity_table()
+    entry = table.lookup(product_id) if table is not None else None
+    if entry is not None:
+        neighbor_ids, scores, source = entry
+    else:
+        similarity = catalog.cached(
+            "attribute_similarity", lambda: AttributeSimilarity(catalog.products)
+        )
+        positions, scores = similarity.neighbors(catalog.position_of(product_id), limit)
+        neighbor_ids = [catalog.products[position]['id'] for position in positions.tolist()]
+        scores = scores.tolist()
+        source = SOURCE_NAMES[SOURCE_ATTRIBUTES]
     
-    # Price statistics
-    prices = [p['price'] for p in products]
-    avg_price = sum(prices) / len(prices) if prices else 0
+    # Neighbors removed from the catalog since the table was built are skipped
+    matches = [
+        (product, score)
+        for product, score in zip((catalog.get(neighbor) for neighbor in neighbor_ids), scores)
+        if product is not None
+    ][:limit]
+    return json_response(
+        ("product_id", dumps(product_id)),
+        ("source", dumps(source)),
+        ("results", scored_products_json(matches, snapshot.version))
+    )
+
+def require_admin(token: Optional[str]):
+    """Reject requests without the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if token is None or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def publish_catalog(catalog: products_data.Catalog, scorer=None,
+                    analytics: Optional[CatalogAnalytics] = None) -> CatalogSnapshot:
+    """
+    Build the snapshot for a catalog, then publish both
     
-    # Price ranges
-    price_ranges = {
-        "Under $100": len([p for p in products if p['price'] < 100]),
-        "$100-$500": len([p for p in products if 100 <= p['price'] < 500]),
-        "$500-$1000": len([p for p in products if 500 <= p['price'] < 1000]),
-        "$1000-$2000": len([p for p in products if 1000 <= p['price'] < 2000]),
-        "$2000+": len([p for p in products if p['price'] >= 2000])
-    }
+    Requests keep being served from the previous snapshot while the
+    indexes and aggregates are built.
+    """
+    global catalog_snapshot
+    snapshot = build_catalog_snapshot(catalog, scorer, analytics)
+    with products_data.write_lock:
+        products_data.replace_catalog(catalog)
+        catalog_snapshot = snapshot
+    return snapshot
+
+def file_state(path: str) -> Optional[tuple]:
+    """Identity of a file, which changes when it is replaced (None if missing)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def catalog_source_state(path: str) -> Optional[tuple]:
+    """Identity of a catalog source and its prices file (None if the source is missing)"""
+    state = file_state(path)
+    if state is None:
+        return None
+    return state, file_state(path + PRICES_SUFFIX)
+
+# State of SMARTCART_CATALOG_PATH when the current catalog was loaded from it
+loaded_source_state = catalog_source_state(products_data.CATALOG_PATH) if products_data.CATALOG_PATH else None
+
+def reload_catalog_source() -> CatalogSnapshot:
+    """
+    Load SMARTCART_CATALOG_PATH and publish it
     
-    # Brand distribution
-    brand_counts = Counter(p['brand'] for p in products)
-    brand_distribution = dict(brand_counts)
-    
-    # Top brands
-    top_brands = [
-        {"brand": brand, "count": count} 
-        for brand, count in brand_counts.most_common(10)
-    ]
-    
-    # Category distribution
-    category_counts = Counter()
-    for product in products:
-        for category in product['categories']:
-            category_counts[category] += 1
-    category_distribution = dict(category_counts)
-    
-    # Rating distribution
-    rating_counts = Counter()
-    for product in products:
-        rating_bucket = f"{int(product['rating'])}.0-{int(product['rating'])}.9"
-        rating_counts[rating_bucket] += 1
-    rating_distribution = dict(rating_counts)
-    
-    # Average price by category
-    price_by_category = {}
-    for category in categories:
-        category_products = [
-            p for p in products 
-            if category in p['categories']
-        ]
-        if category_products:
-            avg = sum(p['price'] for p in category_products) / len(category_products)
-            price_by_category[category] = round(avg, 2)
+    A compiled catalog with the same catalog_id as the current one only
+    differs in prices (see catalog_store.write_prices), so the current
+    scorer is reused and only the filter index and analytics are rebuilt.
+    """
+    global loaded_source_state, embedding_store
+    with products_data.write_lock:
+        state = catalog_source_state(products_data.CATALOG_PATH)
+        products = products_data.load_catalog_source(products_data.CATALOG_PATH)
+        current = catalog_snapshot
+        scorer = None
+        if isinstance(products, MappedCatalog) and isinstance(current.catalog.products, MappedCatalog) \
+                and products.catalog_id is not None \
+                and products.catalog_id == current.catalog.products.catalog_id:
+            scorer = current.scorer
+        snapshot = publish_catalog(products_data.Catalog(products), scorer)
+        loaded_source_state = state
+        if scorer is None:
+            # Checked against the new catalog when next opened
+            embedding_store = None
+    return snapshot
+
+def watch_catalog_source(stop: threading.Event):
+    """Reload the catalog whenever its source file changes, until stop is set"""
+    global loaded_source_state
+    while not stop.wait(CATALOG_POLL_INTERVAL):
+        if catalog_source_state(products_data.CATALOG_PATH) in (None, loaded_source_state):
+            continue
+        with products_data.write_lock:
+            state = catalog_source_state(products_data.CATALOG_PATH)
+            if state in (None, loaded_source_state):
+                continue
+            try:
+                reload_catalog_source()
+            except (OSError, ValueError) as error:
+                # Not retried until the file changes again
+                loaded_source_state = state
+                warnings.warn(f"Could not reload catalog: {error}")
+
+def update_prices(prices: Dict[int, float]) -> Tuple[CatalogSnapshot, List[int]]:
+    """
+    Publish a catalog with changed prices
     
-    return {
-        "total_products": total_products,
-        "total_brands": len(brands),
-        "total_categories": len(categories),
-        "avg_price": round(avg_price, 2),
-        "price_ranges": price_ranges,
-        "brand_distribution": brand_distribution,
-        "category_distribution": category_distribution,
-        "rating_distribution": rating_distribution,
-        "top_brands": top_brands,
-        "price_by_category": price_by_category
-    }
+    With a compiled catalog source, the prices are written to its prices
+    file and this process reloads it; other worker processes pick the change
+    up when they next check the files (see CATALOG_POLL_INTERVAL). No
+    product is decoded, and the scorer is reused since prices do not affect
+    relevance.
+    
+    Otherwise (bundled products or a CSV source) the change is made in
+    memory, in this process only: the normalized view and scorer are reused
+    and the analytics aggregate is updated per changed product.
+    
+    Returns:
+        (published snapshot, IDs not found in the catalog)
+    """
+    with products_data.write_lock:
+        current = catalog_snapshot
+        catalog = current.catalog
+        if products_data.CATALOG_PATH and isinstance(catalog.products, MappedCatalog):
+            missing = write_prices(products_data.CATALOG_PATH, prices)
+            if len(missing) == len(prices):
+                return current, missing
+            return reload_catalog_source(), missing
+        
+        products = list(catalog.products)
+        positions = {product['id']: position for position, product in enumerate(products)}
+        analytics = current.analytics.copy()
+        missing = []
+        for product_id, price in prices.items():
+            position = positions.get(product_id)
+            if position is None:
+                missing.append(product_id)
+                continue
+            old_product = products[position]
+            new_product = {**old_product, "price": price}
+            products[position] = new_product
+            analytics.apply(old_product, new_product)
+        
+        if len(missing) == len(prices):
+            return current, missing
+        snapshot = publish_catalog(
+            products_data.Catalog(products, catalog.normalized), current.scorer, analytics
+        )
+    return snapshot, missing
+
+@app.post("/api/admin/catalog:reload", response_model=CatalogUpdateResponse)
+def reload_catalog(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload the catalog from SMARTCART_CATALOG_PATH without a restart
+    
+    The new catalog, indexes and analytics are built while requests are
+    served from the current ones, then published in one swap. This reloads
+    the process handling the request; with several workers, the others
+    reload when they next see the file change (see CATALOG_POLL_INTERVAL).
+    """
+    require_admin(x_admin_token)
+    if not products_data.CATALOG_PATH:
+        raise HTTPException(status_code=400, detail="No catalog source configured")
+    try:
+        snapshot = reload_catalog_source()
+    except (OSError, ValueError) as error:
+        raise HTTPException(status_code=500, detail=f"Could not load catalog: {error}")
+    return {"version": snapshot.version, "products_loaded": len(snapshot.catalog), "missing": []}
+
+@app.post("/api/admin/prices", response_model=CatalogUpdateResponse)
+def set_prices(request: PriceUpdateRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Update product prices
+    
+    All prices in a request are published together as one new catalog
+    version; unknown IDs are listed in `missing`. With a compiled catalog
+    source (SMARTCART_CATALOG_PATH) the prices are saved to it and reach
+    every worker process; otherwise they only change the catalog of the
+    process handling the request, so run a single worker.
+    """
+    require_admin(x_admin_token)
+    invalid = [product_id for product_id, price in request.prices.items()
+               if not math.isfinite(price) or price < 0]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid prices for products: {invalid}")
+    try:
+        snapshot, missing = update_prices(request.prices)
+    except (OSError, ValueError) as error:
+        raise HTTPException(status_code=500, detail=f"Could not save prices: {error}")
+    return {"version": snapshot.version, "products_loaded": len(snapshot.catalog), "missing": missing}
+
+@app.get("/api/analytics", response_model=AnalyticsResponse)
+async def get_analytics():
+    """
+    Get analytics and statistics about the product catalog
+    
+    Served from the analytics aggregate of the current catalog snapshot.
+    """
+    return catalog_snapshot.analytics.to_response()
 
 @app.get("/api/categories")
 async def get_categories():
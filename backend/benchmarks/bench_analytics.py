@@ -0,0 +1,110 @@
+"""
+SmartCart AI - Analytics Benchmark
+Compare the original multi-pass get_analytics with the single-pass aggregation kernel
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py
+    python benchmarks/bench_analytics.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from catalog_analytics import CatalogAnalytics
+from synthetic import make_catalog
+
+
+def legacy_analytics(products):
+    """Original /api/analytics implementation (~10 + N_categories passes)"""
+    total_products = len(products)
+    brands = sorted({p['brand'] for p in products})
+    categories = sorted({c for p in products for c in p['categories']})
+
+    prices = [p['price'] for p in products]
+    avg_price = sum(prices) / len(prices) if prices else 0
+
+    price_ranges = {
+        "Under $100": len([p for p in products if p['price'] < 100]),
+        "$100-$500": len([p for p in products if 100 <= p['price'] < 500]),
+        "$500-$1000": len([p for p in products if 500 <= p['price'] < 1000]),
+        "$1000-$2000": len([p for p in products if 1000 <= p['price'] < 2000]),
+        "$2000+": len([p for p in products if p['price'] >= 2000])
+    }
+
+    brand_counts = Counter(p['brand'] for p in products)
+    top_brands = [{"brand": b, "count": c} for b, c in brand_counts.most_common(10)]
+
+    category_counts = Counter()
+    for product in products:
+        for category in product['categories']:
+            category_counts[category] += 1
+
+    rating_counts = Counter()
+    for product in products:
+        rating_counts[f"{int(product['rating'])}.0-{int(product['rating'])}.9"] += 1
+
+    price_by_category = {}
+    for category in categories:
+        category_products = [p for p in products if category in p['categories']]
+        if category_products:
+            avg = sum(p['price'] for p in category_products) / len(category_products)
+            price_by_category[category] = round(avg, 2)
+
+    return {
+        "total_products": total_products,
+        "total_brands": len(brands),
+        "total_categories": len(categories),
+        "avg_price": round(avg_price, 2),
+        "price_ranges": price_ranges,
+        "brand_distribution": dict(brand_counts),
+        "category_distribution": dict(category_counts),
+        "rating_distribution": dict(rating_counts),
+        "top_brands": top_brands,
+        "price_by_category": price_by_category
+    }
+
+
+def single_pass_analytics(products):
+    """Single-pass kernel behind the cached analytics aggregate"""
+    return CatalogAnalytics(products).to_response()
+
+
+def best_of(func, products, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(products)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'legacy (s)':>12} {'single-pass (s)':>16} {'speedup':>9}")
+    for size in args.sizes:
+        products = make_catalog(size)
+        legacy_time, legacy = best_of(legacy_analytics, products, args.repeat)
+        kernel_time, kernel = best_of(single_pass_analytics, products, args.repeat)
+
+        # Sanity check: both versions agree (averages to the cent)
+        for key in ("total_products", "total_brands", "total_categories", "price_ranges",
+                    "brand_distribution", "category_distribution", "rating_distribution"):
+            assert legacy[key] == kernel[key], key
+        assert abs(legacy["avg_price"] - kernel["avg_price"]) <= 0.01
+
+        print(f"{size:>10} {legacy_time:>12.4f} {kernel_time:>16.4f} "
+              f"{legacy_time / kernel_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
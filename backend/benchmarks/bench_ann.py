@@ -0,0 +1,88 @@
+"""
+SmartCart AI - ANN Index Benchmark
+Compare exact cosine search with the IVF-flat index: build time, latency percentiles and recall
+
+Usage (from backend/):
+    python benchmarks/bench_ann.py
+    python benchmarks/bench_ann.py --size 1000000 --nprobe 8 16 32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ann_index import build_ivf_index
+from embedding_store import EmbeddingStore
+from synthetic import make_queries, write_embeddings
+
+
+def timed_search(search, queries, k):
+    """Run every query once; return (results, latencies in ms)"""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query, k))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def recall(approximate, exact):
+    """Mean fraction of the exact top-k found by the approximate search"""
+    return float(np.mean([
+        len(np.intersect1d(found[0], truth[0])) / len(truth[0])
+        for found, truth in zip(approximate, exact)
+    ]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cluster-size", type=int, default=1000, help="synthetic products per topic")
+    parser.add_argument("--lists", type=int, default=None, help="inverted lists (default ~sqrt(n))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--dir", default=None, help="working directory (default: a temporary one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        start = time.perf_counter()
+        embeddings = write_embeddings(os.path.join(workdir, "embeddings.npy"), args.size, args.dim,
+                                      cluster_size=args.cluster_size)
+        print(f"Generated {args.size} x {args.dim} embeddings in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index = build_ivf_index(embeddings, os.path.join(workdir, "embeddings.ivf"), args.lists)
+        print(f"Built IVF index ({index.n_lists} lists) in {time.perf_counter() - start:.1f}s")
+
+        store = EmbeddingStore(embeddings, ann=index)
+        queries = make_queries(embeddings, args.queries)
+
+        # Warm the page cache so both searches read from memory
+        store.search(queries[0], args.k, exact=True)
+        exact, latencies = timed_search(
+            lambda query, k: store.search(query, k, exact=True), queries, args.k
+        )
+        print(f"\n{'search':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'recall@' + str(args.k):>10}")
+        print(f"{'exact':>12} {np.percentile(latencies, 50):>10.2f} "
+              f"{np.percentile(latencies, 99):>10.2f} {1.0:>10.3f}")
+
+        for nprobe in args.nprobe:
+            def search(query, k):
+                rows, scores = index.search(store.check_queries(query)[0], k, nprobe)
+                return store.product_ids[rows], scores
+            approximate, latencies = timed_search(search, queries, args.k)
+            print(f"{'nprobe=' + str(nprobe):>12} {np.percentile(latencies, 50):>10.2f} "
+                  f"{np.percentile(latencies, 99):>10.2f} {recall(approximate, exact):>10.3f}")
+        del store, index, embeddings
+
+
+if __name__ == "__main__":
+    main()
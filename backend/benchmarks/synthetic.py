@@ -0,0 +1,81 @@
+"""
+SmartCart AI - Synthetic Catalogs
+Generate large product catalogs shaped like products_data.PRODUCTS, and
+clustered embedding matrices, for benchmarks
+"""
+
+import random
+from typing import List
+
+import numpy as np
+
+BRANDS = [f"Brand {i}" for i in range(200)]
+CATEGORIES = [f"Category {i}" for i in range(60)]
+WORDS = [
+    "wireless", "pro", "max", "ultra", "smart", "portable", "gaming", "camera",
+    "battery", "display", "noise", "cancelling", "laptop", "phone", "watch",
+    "speaker", "keyboard", "monitor", "oled", "fitness", "audio", "usb-c", "5g",
+]
+
+
+def make_catalog(n: int, seed: int = 42) -> List[dict]:
+    """
+    Build a synthetic catalog of n products
+
+    Text fields reuse a small vocabulary so large catalogs stay cheap to hold
+    in memory while keeping realistic brand/category/price/rating spreads.
+    """
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, n + 1):
+        title_words = rng.sample(WORDS, 3)
+        products.append({
+            "id": product_id,
+            "title": " ".join(title_words).title(),
+            "brand": rng.choice(BRANDS),
+            "price": round(rng.lognormvariate(5.5, 1.0), 2),
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 3)),
+            "description": " ".join(rng.sample(WORDS, 8)),
+            "image_url": f"https://example.com/images/{product_id}.jpg",
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "features": [word.title() for word in rng.sample(WORDS, 4)],
+            "specifications": " ".join(rng.sample(WORDS, 4)),
+        })
+    return products
+
+
+def write_embeddings(path: str, n: int, dim: int = 384, seed: int = 42,
+                     cluster_size: int = 100, spread: float = 1.2,
+                     chunk_rows: int = 65536) -> np.ndarray:
+    """
+    Write a synthetic float32 embedding matrix to a .npy file, in chunks
+
+    Vectors are unit-length points scattered around random topic centers
+    (about cluster_size products per topic, noise scaled by spread), which
+    gives nearest-neighbor structure similar to sentence embeddings of a
+    product catalog.
+
+    Returns:
+        The matrix, memory-mapped read-only
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // cluster_size), dim)).astype(np.float32)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, chunk_rows):
+        rows = min(chunk_rows, n - start)
+        chunk = centers[rng.integers(len(centers), size=rows)]
+        chunk += spread * rng.standard_normal((rows, dim), dtype=np.float32)
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+        matrix[start:start + rows] = chunk
+    matrix.flush()
+    del matrix
+    return np.load(path, mmap_mode="r")
+
+
+def make_queries(embeddings: np.ndarray, n: int, seed: int = 7) -> np.ndarray:
+    """Unit-length queries near random stored vectors"""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(embeddings), size=n, replace=False))
+    queries = np.asarray(embeddings[rows], dtype=np.float32)
+    queries = queries + 0.5 * rng.standard_normal(queries.shape, dtype=np.float32) / np.sqrt(queries.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
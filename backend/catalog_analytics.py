@@ -0,0 +1,238 @@
+"""
+SmartCart AI - Catalog Analytics
+Analytics aggregate computed once and maintained incrementally on catalog changes
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog_store import catalog_columns
+
+# Price histogram buckets as (label, lower bound, upper bound), upper bound exclusive
+PRICE_RANGES = [
+    ("Under $100", None, 100),
+    ("$100-$500", 100, 500),
+    ("$500-$1000", 500, 1000),
+    ("$1000-$2000", 1000, 2000),
+    ("$2000+", 2000, None),
+]
+PRICE_EDGES = np.array([lower for _, lower, _ in PRICE_RANGES[1:]], dtype=np.float64)
+
+
+def price_range_label(price: float) -> str:
+    """Price histogram bucket for a price"""
+    for label, lower, upper in PRICE_RANGES:
+        if (lower is None or price >= lower) and (upper is None or price < upper):
+            return label
+    return PRICE_RANGES[-1][0]
+
+
+def rating_bucket_label(rating: float) -> str:
+    """Rating histogram bucket for a rating"""
+    return f"{int(rating)}.0-{int(rating)}.9"
+
+
+class RunningSum:
+    """
+    Compensated (Neumaier) running sum
+
+    Long sequences of additions and removals would otherwise accumulate
+    floating point drift in the maintained price sums.
+    """
+
+    __slots__ = ("total", "compensation")
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value: float):
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+
+    def copy(self) -> "RunningSum":
+        other = RunningSum()
+        other.total = self.total
+        other.compensation = self.compensation
+        return other
+
+    @property
+    def value(self) -> float:
+        return self.total + self.compensation
+
+
+class CatalogAnalytics:
+    """
+    Running analytics aggregate for the product catalog.
+
+    Holds counts and sums rather than derived values, so adding, removing or
+    changing a product is an O(categories of that product) update. The
+    /api/analytics response is built from the aggregate on demand and cached
+    until the next change. Top brands with equal counts are listed in the
+    order the brands were first seen.
+    """
+
+    def __init__(self, products: List[dict] = ()):
+        self.total_products = 0
+        self.price_sum = RunningSum()
+        self.price_range_counts = Counter({label: 0 for label, _, _ in PRICE_RANGES})
+        self.brand_counts = Counter()
+        self.category_counts = Counter()
+        self.rating_counts = Counter()
+        # Per category, counting each product once even if a category repeats
+        self.category_members = Counter()
+        self.category_price_sums: Dict[str, RunningSum] = {}
+        self._response: Optional[dict] = None
+
+        if len(products):
+            self._load(products)
+
+    def _load(self, products: List[dict]):
+        """
+        Bulk-build the aggregate in a single pass over the catalog
+
+        One pass extracts the price, rating, brand and category columns (or
+        reads them straight from a mapped catalog file); every statistic is
+        then computed from those columns with vectorized NumPy reductions.
+        """
+        columns = catalog_columns(products)
+        n = len(columns.prices)
+        prices = np.asarray(columns.prices, dtype=np.float64)
+        ratings = np.asarray(columns.ratings, dtype=np.float64)
+        brand_codes = np.asarray(columns.brand_codes, dtype=np.int64)
+        brands = columns.brands
+        categories = columns.categories
+        category_products = columns.category_products
+        category_codes = np.asarray(columns.category_codes, dtype=np.int64)
+        n_categories = len(categories)
+
+        self.total_products = n
+        self.price_sum.add(float(np.sum(prices)))
+
+        # Price histogram
+        range_counts = np.bincount(np.searchsorted(PRICE_EDGES, prices, side='right'),
+                                   minlength=len(PRICE_RANGES))
+        for (label, _, _), count in zip(PRICE_RANGES, range_counts.tolist()):
+            self.price_range_counts[label] = count
+
+        # Rating buckets, in order of first appearance
+        buckets = np.trunc(ratings).astype(np.int64)
+        values, first_seen, counts = np.unique(buckets, return_index=True, return_counts=True)
+        for index in np.argsort(first_seen, kind='stable').tolist():
+            self.rating_counts[rating_bucket_label(values[index])] = int(counts[index])
+
+        # Brand counts (codes are in order of first appearance)
+        brand_counts = np.bincount(brand_codes, minlength=len(brands))
+        for brand, count in zip(brands, brand_counts.tolist()):
+            self.brand_counts[brand] = count
+
+        # Category counts, plus per-category membership and price sums with
+        # repeated categories of the same product counted once
+        category_counts = np.bincount(category_codes, minlength=n_categories)
+        membership = np.unique(category_products * max(n_categories, 1) + category_codes)
+        member_products, member_codes = np.divmod(membership, max(n_categories, 1))
+        member_counts = np.bincount(member_codes, minlength=n_categories)
+        member_sums = np.bincount(member_codes, weights=prices[member_products],
+                                  minlength=n_categories)
+        for category, count, members, price_sum in zip(
+            categories, category_counts.tolist(), member_counts.tolist(), member_sums.tolist()
+        ):
+            self.category_counts[category] = count
+            self.category_members[category] = members
+            self.category_price_sums[category] = RunningSum()
+            self.category_price_sums[category].add(price_sum)
+
+    def copy(self) -> "CatalogAnalytics":
+        """Independent copy of the aggregate (O(brands + categories))"""
+        other = CatalogAnalytics()
+        other.total_products = self.total_products
+        other.price_sum = self.price_sum.copy()
+        other.price_range_counts = self.price_range_counts.copy()
+        other.brand_counts = self.brand_counts.copy()
+        other.category_counts = self.category_counts.copy()
+        other.rating_counts = self.rating_counts.copy()
+        other.category_members = self.category_members.copy()
+        other.category_price_sums = {
+            category: price_sum.copy() for category, price_sum in self.category_price_sums.items()
+        }
+        other._response = self._response
+        return other
+
+    def _update(self, product: dict, sign: int):
+        price = product['price']
+        self.total_products += sign
+        self.price_sum.add(sign * price)
+        self.price_range_counts[price_range_label(price)] += sign
+        self.rating_counts[rating_bucket_label(product['rating'])] += sign
+        self._count(self.brand_counts, product['brand'], sign)
+        for category in product['categories']:
+            self._count(self.category_counts, category, sign)
+        for category in set(product['categories']):
+            self._count(self.category_members, category, sign)
+            if category in self.category_members:
+                if category not in self.category_price_sums:
+                    self.category_price_sums[category] = RunningSum()
+                self.category_price_sums[category].add(sign * price)
+            else:
+                self.category_price_sums.pop(category, None)
+        self._response = None
+
+    @staticmethod
+    def _count(counter: Counter, key: str, sign: int):
+        counter[key] += sign
+        if counter[key] <= 0:
+            del counter[key]
+
+    def add(self, product: dict):
+        """Include a new product"""
+        self._update(product, 1)
+
+    def remove(self, product: dict):
+        """Exclude a removed product"""
+        self._update(product, -1)
+
+    def apply(self, old_product: Optional[dict], new_product: Optional[dict]):
+        """Apply a catalog change (see products_data.subscribe)"""
+        if old_product is not None:
+            self.remove(old_product)
+        if new_product is not None:
+            self.add(new_product)
+
+    def to_response(self) -> dict:
+        """Analytics in the /api/analytics response shape"""
+        if self._response is not None:
+            return self._response
+
+        total = self.total_products
+        rating_distribution = {
+            bucket: count for bucket, count in self.rating_counts.items() if count > 0
+        }
+        price_by_category = {
+            category: round(
+                self.category_price_sums[category].value / self.category_members[category], 2
+            )
+            for category in sorted(self.category_members)
+        }
+
+        self._response = {
+            "total_products": total,
+            "total_brands": len(self.brand_counts),
+            "total_categories": len(self.category_counts),
+            "avg_price": round(self.price_sum.value / total, 2) if total else 0,
+            "price_ranges": dict(self.price_range_counts),
+            "brand_distribution": dict(self.brand_counts),
+            "category_distribution": dict(self.category_counts),
+            "rating_distribution": rating_distribution,
+            "top_brands": [
+                {"brand": brand, "count": count}
+                for brand, count in self.brand_counts.most_common(10)
+            ],
+            "price_by_category": price_by_category
+        }
+        return self._response
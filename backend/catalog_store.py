@@ -0,0 +1,427 @@
+"""
+SmartCart AI - Binary Catalog Store
+Compact columnar catalog file (string tables + fixed-width numeric columns) opened with mmap
+
+File layout (little endian):
+    magic           8 bytes  b"SMCART01"
+    n_products      uint64
+    n_sections      uint64
+    section table   n_sections x (name 32s, dtype 8s, offset uint64, count uint64)
+    sections        raw column data, each aligned to 64 bytes
+
+String columns are stored as "<name>.offsets" (int64, n + 1 entries) plus
+"<name>.data" (UTF-8 bytes). Brands and categories are dictionary encoded
+against small string tables. The search index arrays (see
+search_index.build_index_arrays) are stored as "search.<name>" sections,
+so server workers map the index instead of building it. Numeric columns
+are exposed as NumPy views of the mapping, so every worker process opening
+the same file shares its pages instead of holding its own copy.
+
+Each compiled file gets a random "catalog_id". Price updates are written to
+a small "<path>.prices" file instead (magic b"SMPRIC01", catalog_id uint64,
+n_products uint64, then the float64 prices), which overrides the stored
+price column of the catalog with the same catalog_id. A catalog with an
+unchanged catalog_id has unchanged text, so its search indexes still apply.
+
+The "fingerprint" section identifies the CSV rows the catalog was compiled
+from (see catalog_fingerprint).
+
+Files are written to a temporary name and renamed into place, so a process
+that has the previous file mapped keeps reading it unchanged until it opens
+the new one.
+
+Usage (from backend/):
+    python catalog_store.py catalog.bin    # compile products_data.PRODUCTS
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAGIC = b"SMCART01"
+HEADER = struct.Struct("<8sQQ")
+SECTION = struct.Struct("<32s8sQQ")
+ALIGNMENT = 64
+
+PRICES_MAGIC = b"SMPRIC01"
+PRICES_HEADER = struct.Struct("<8sQQ")
+PRICES_SUFFIX = ".prices"
+
+TEXT_FIELDS = ["title", "description", "image_url", "specifications"]
+
+
+class CatalogColumns:
+    """
+    Columnar view of the numeric and dictionary-encoded catalog attributes
+
+    Attributes:
+        prices, ratings: float64 per product
+        brand_codes: brand index per product, into brands
+        category_offsets: product i's categories are
+            category_codes[category_offsets[i]:category_offsets[i + 1]]
+        category_codes: category index per (product, category), into categories
+        brands, categories: string tables, in order of first appearance
+    """
+
+    def __init__(self, prices, ratings, brand_codes, brands,
+                 category_offsets, category_codes, categories):
+        self.prices = prices
+        self.ratings = ratings
+        self.brand_codes = brand_codes
+        self.brands = brands
+        self.category_offsets = category_offsets
+        self.category_codes = category_codes
+        self.categories = categories
+
+    @property
+    def category_products(self) -> np.ndarray:
+        """Product position of every (product, category) entry"""
+        counts = np.diff(self.category_offsets)
+        return np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+
+
+def catalog_columns(products: Sequence) -> CatalogColumns:
+    """
+    Columns for a catalog
+
+    Mapped catalogs return views of their stored columns; product lists are
+    converted in a single pass.
+    """
+    if isinstance(products, MappedCatalog):
+        return products.columns()
+
+    n = len(products)
+    prices = np.empty(n, dtype=np.float64)
+    ratings = np.empty(n, dtype=np.float64)
+    brand_codes = np.empty(n, dtype=np.int64)
+    category_offsets = np.zeros(n + 1, dtype=np.int64)
+    brands: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    category_codes: List[int] = []
+
+    for position, product in enumerate(products):
+        prices[position] = product['price']
+        ratings[position] = product['rating']
+        brand_codes[position] = brands.setdefault(product['brand'], len(brands))
+        for category in product['categories']:
+            category_codes.append(categories.setdefault(category, len(categories)))
+        category_offsets[position + 1] = len(category_codes)
+
+    return CatalogColumns(
+        prices, ratings, brand_codes, list(brands),
+        category_offsets, np.asarray(category_codes, dtype=np.int64), list(categories)
+    )
+
+
+def catalog_fingerprint(products: Sequence) -> Optional[str]:
+    """
+    Identity of the CSV rows a catalog was loaded from
+
+    A hex digest of the (id, uniq_id) pairs of the products that have a
+    uniq_id (see csv_loader.py), in ID order, so products added through the
+    API do not change it. Exported embeddings record the fingerprint of the
+    CSV they were computed from (see notebooks/embedding_pipeline.py).
+
+    Returns:
+        The fingerprint, or None for a catalog file compiled without one
+    """
+    if isinstance(products, MappedCatalog):
+        return products.fingerprint
+    digest = hashlib.blake2b(digest_size=16)
+    for product in sorted((product for product in products if "uniq_id" in product),
+                          key=lambda product: product["id"]):
+        digest.update(f"{product['id']}\t{product['uniq_id']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _string_column(values: List[str]):
+    """Encode strings as (offsets, data) arrays"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_catalog(products: Sequence, path: str):
+    """
+    Compile a catalog into the binary format
+
+    Args:
+        products: Products in the products_data.PRODUCTS shape
+        path: Output file path
+    """
+    columns = catalog_columns(products)
+    ids = np.array([product['id'] for product in products], dtype=np.int64)
+
+    id_order = np.argsort(ids, kind="stable").astype(np.int64)
+    sections = {
+        "catalog_id": np.frombuffer(os.urandom(8), dtype=np.uint64),
+        "id": ids,
+        "id_order": id_order,
+        "id_sorted": ids[id_order],
+        "price": columns.prices,
+        "rating": columns.ratings,
+        "brand_code": columns.brand_codes.astype(np.int32),
+        "category_offsets": columns.category_offsets.astype(np.int64),
+        "category_code": columns.category_codes.astype(np.int32),
+    }
+    for name, values in (("brands", columns.brands), ("categories", columns.categories)):
+        sections[f"{name}.offsets"], sections[f"{name}.data"] = _string_column(values)
+    for field in TEXT_FIELDS:
+        sections[f"{field}.offsets"], sections[f"{field}.data"] = \
+            _string_column([product[field] for product in products])
+
+    feature_offsets = np.zeros(len(products) + 1, dtype=np.int64)
+    np.cumsum([len(product['features']) for product in products], out=feature_offsets[1:])
+    sections["feature_offsets"] = feature_offsets
+    sections["features.offsets"], sections["features.data"] = _string_column(
+        [feature for product in products for feature in product['features']]
+    )
+
+    fingerprint = catalog_fingerprint(products)
+    if fingerprint is not None:
+        sections["fingerprint"] = np.frombuffer(fingerprint.encode("ascii"), dtype=np.uint8)
+
+    # Imported here: search_index imports products_data, which imports this module
+    from search_index import build_index_arrays
+    for name, array in build_index_arrays(products).items():
+        sections[f"search.{name}"] = array
+
+    # Lay out sections after the header and section table
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, array in sections.items():
+        offset += -offset % ALIGNMENT
+        table.append((name, array, offset))
+        offset += array.nbytes
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(products), len(sections)))
+        for name, array, section_offset in table:
+            f.write(SECTION.pack(name.encode("ascii"), array.dtype.str.encode("ascii"),
+                                 section_offset, len(array)))
+        for name, array, section_offset in table:
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.write(b"\0" * (offset - f.tell()))
+    os.replace(temporary, path)
+
+
+def _read_sections(buffer) -> Dict[str, np.ndarray]:
+    """Section arrays of a catalog file, as views of a buffer"""
+    magic, n_products, n_sections = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("not a SmartCart catalog file")
+    sections = {}
+    for index in range(n_sections):
+        name, dtype, offset, count = SECTION.unpack_from(buffer, HEADER.size + index * SECTION.size)
+        sections[name.rstrip(b"\0").decode("ascii")] = np.frombuffer(
+            buffer, dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+            count=count, offset=offset
+        )
+    return sections
+
+
+@contextmanager
+def _exclusive_lock(path: str):
+    """Hold an exclusive lock on a lock file, blocking until it is free"""
+    with open(path, "a") as lock:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+            return
+        lock.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                # LK_LOCK gives up after about 10 seconds; keep waiting
+                continue
+        try:
+            yield
+        finally:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_prices(path: str, catalog_id: Optional[int], n_products: int) -> Optional[np.ndarray]:
+    """Prices from a prices file, or None if missing or written for another catalog"""
+    if catalog_id is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buffer) < PRICES_HEADER.size or \
+            PRICES_HEADER.unpack_from(buffer, 0) != (PRICES_MAGIC, catalog_id, n_products):
+        return None
+    return np.frombuffer(buffer, dtype="<f8", count=n_products, offset=PRICES_HEADER.size)
+
+
+def write_prices(path: str, prices: Dict[int, float]) -> List[int]:
+    """
+    Write changed prices for a catalog file
+
+    The full price column, with the changes applied, is written to the
+    catalog's prices file (see PRICES_SUFFIX); the catalog file itself is
+    not touched and no product is decoded. Concurrent writers (e.g. several
+    server workers) are serialized with a lock file next to the catalog.
+
+    Returns:
+        IDs not found in the catalog
+
+    Raises:
+        ValueError: The file was compiled without a catalog_id
+    """
+    with _exclusive_lock(path + ".lock"):
+        catalog = MappedCatalog(path)
+        if catalog.catalog_id is None:
+            raise ValueError(f"{path} does not support price updates; recompile it with catalog_store.py")
+        ids = np.fromiter(prices, dtype=np.int64, count=len(prices))
+        values = np.fromiter(prices.values(), dtype=np.float64, count=len(prices))
+        id_sorted = catalog._sections["id_sorted"]
+        slots = np.searchsorted(id_sorted, ids)
+        found = slots < len(id_sorted)
+        found[found] = id_sorted[slots[found]] == ids[found]
+        if found.any():
+            updated = np.array(catalog.prices, dtype="<f8")
+            updated[catalog._sections["id_order"][slots[found]]] = values[found]
+            prices_path = path + PRICES_SUFFIX
+            temporary = prices_path + ".tmp"
+            with open(temporary, "wb") as f:
+                f.write(PRICES_HEADER.pack(PRICES_MAGIC, catalog.catalog_id, len(updated)))
+                f.write(updated.tobytes())
+            os.replace(temporary, prices_path)
+    return ids[~found].tolist()
+
+
+class MappedCatalog(Sequence):
+    """
+    Read-only catalog backed by a memory-mapped binary catalog file.
+
+    Behaves like the products list: indexing returns product dicts, decoded
+    on access. Numeric columns stay in the shared mapping. Prices come from
+    the catalog's prices file when one was written for it (see write_prices).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._sections: Dict[str, np.ndarray] = _read_sections(self._mmap)
+        except ValueError:
+            raise ValueError(f"{path} is not a SmartCart catalog file")
+        self._length = HEADER.unpack_from(self._mmap, 0)[1]
+
+        # None for files compiled before catalog IDs were stored
+        catalog_id = self._sections.get("catalog_id")
+        self.catalog_id = None if catalog_id is None else int(catalog_id[0])
+        fingerprint = self._sections.get("fingerprint")
+        self.fingerprint = None if fingerprint is None else fingerprint.tobytes().decode("ascii")
+
+        self.ids = self._sections["id"]
+        self.prices = _read_prices(path + PRICES_SUFFIX, self.catalog_id, self._length)
+        if self.prices is None:
+            self.prices = self._sections["price"]
+        self.ratings = self._sections["rating"]
+        self.brands = self._strings("brands")
+        self.categories = self._strings("categories")
+
+    def _strings(self, name: str) -> List[str]:
+        """Decode a whole string column (used for the small string tables)"""
+        return [self._string(name, index) for index in range(len(self._sections[f"{name}.offsets"]) - 1)]
+
+    def _string(self, name: str, index: int) -> str:
+        offsets = self._sections[f"{name}.offsets"]
+        data = self._sections[f"{name}.data"]
+        start, end = offsets[index:index + 2].tolist()
+        return data[start:end].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("catalog index out of range")
+
+        sections = self._sections
+        first, last = sections["category_offsets"][index:index + 2].tolist()
+        category_codes = sections["category_code"][first:last]
+        first, last = sections["feature_offsets"][index:index + 2].tolist()
+        return {
+            "id": int(self.ids[index]),
+            "title": self._string("title", index),
+            "brand": self.brands[int(sections["brand_code"][index])],
+            "price": float(self.prices[index]),
+            "categories": [self.categories[code] for code in category_codes.tolist()],
+            "description": self._string("description", index),
+            "image_url": self._string("image_url", index),
+            "rating": float(self.ratings[index]),
+            "features": [self._string("features", i) for i in range(first, last)],
+            "specifications": self._string("specifications", index),
+        }
+
+    def position_of(self, product_id: int) -> Optional[int]:
+        """Catalog position of a product ID (binary search), or None"""
+        sorted_ids = self._sections["id_sorted"]
+        slot = int(np.searchsorted(sorted_ids, product_id))
+        if slot < len(sorted_ids) and sorted_ids[slot] == product_id:
+            return int(self._sections["id_order"][slot])
+        return None
+
+    def get_by_id(self, product_id: int) -> Optional[dict]:
+        """Product with an ID, or None"""
+        position = self.position_of(product_id)
+        return None if position is None else self[position]
+
+    def search_arrays(self) -> Optional[Dict[str, np.ndarray]]:
+        """Stored search index arrays, or None for files compiled without them"""
+        arrays = {name[len("search."):]: array for name, array in self._sections.items()
+                  if name.startswith("search.")}
+        return arrays or None
+
+    def columns(self) -> CatalogColumns:
+        """Stored columns, as views of the mapping"""
+        sections = self._sections
+        return CatalogColumns(
+            self.prices, self.ratings, sections["brand_code"], self.brands,
+            sections["category_offsets"], sections["category_code"],
+            self.categories
+        )
+
+
+def open_catalog(path: str) -> MappedCatalog:
+    """Open a binary catalog file"""
+    return MappedCatalog(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(1)
+    import products_data
+    write_catalog(products_data.get_all_products(), sys.argv[1])
+    print(f"Wrote {len(products_data.get_all_products())} products to {sys.argv[1]}")
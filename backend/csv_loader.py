@@ -0,0 +1,262 @@
+"""
+SmartCart AI - CSV Catalog Loader
+Streaming, chunked loader for product exports shaped like intern_data_ikarus.csv
+
+The export columns are title, brand, description, price ("$24.99", may be
+empty), categories and images (stringified Python lists), manufacturer,
+package_dimensions, country_of_origin, material, color and uniq_id. Rows are
+converted to the products_data.PRODUCTS shape:
+
+    id              row number in the file, starting at 1
+    price           parsed from the price string, 0.0 when missing
+    image_url       first entry of images
+    rating          0.0 (the export has no ratings)
+    features        material and color, when present
+    specifications  package dimensions and country of origin
+    uniq_id         kept from the export
+
+Large files are split into byte ranges at record boundaries and parsed by a
+pool of worker processes; ranges come back in file order.
+
+Usage (from backend/):
+    python csv_loader.py ../intern_data_ikarus.csv catalog.bin    # compile to a catalog file
+"""
+
+import ast
+import csv
+import io
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Byte range handed to each worker
+CHUNK_BYTES = 32 * 1024 * 1024
+# Files smaller than this are parsed in-process
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+# Block size used when scanning for record boundaries
+SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+
+DEFAULT_BRAND = "Generic"
+
+REQUIRED_COLUMNS = ["title", "brand", "description", "price", "categories", "images", "uniq_id"]
+OPTIONAL_COLUMNS = ["package_dimensions", "country_of_origin", "material", "color"]
+
+# One quoted item of a Python list repr: 'text' or "text"
+_LIST_ITEM = re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\"")
+_PRICE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+csv.field_size_limit(sys.maxsize)
+
+
+def parse_list(value: str) -> List[str]:
+    """
+    Parse a stringified Python list of strings, e.g. "['A', \"Kids' B\"]"
+
+    Items are stripped. Only strings containing backslash escapes fall back
+    to ast.literal_eval; everything else is a single regex scan.
+    """
+    if not value or value == "[]":
+        return []
+    if "\\" in value:
+        try:
+            items = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+        return [str(item).strip() for item in items if str(item).strip()]
+    items = []
+    for single, double in _LIST_ITEM.findall(value):
+        item = (single or double).strip()
+        if item:
+            items.append(item)
+    return items
+
+
+def first_list_item(value: str) -> str:
+    """First non-empty item of a stringified Python list, without parsing the rest"""
+    if "\\" in value:
+        items = parse_list(value)
+        return items[0] if items else ""
+    match = _LIST_ITEM.search(value)
+    while match:
+        item = (match.group(1) or match.group(2) or "").strip()
+        if item:
+            return item
+        match = _LIST_ITEM.search(value, match.end())
+    return ""
+
+
+def parse_price(value: str) -> float:
+    """Parse a price string like "$1,299.99" (first amount of a range), 0.0 if missing"""
+    match = _PRICE.search(value) if value else None
+    return float(match.group().replace(",", "")) if match else 0.0
+
+
+def _column_indexes(header: Sequence[str]) -> Dict[str, int]:
+    """Column name -> index, checking that the required columns exist"""
+    indexes = {name.strip(): index for index, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in indexes]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return indexes
+
+
+def _convert_rows(rows: Iterator[List[str]], columns: Dict[str, int]) -> List[dict]:
+    """Convert CSV rows to products (ids are assigned by the caller)"""
+    title = columns["title"]
+    brand = columns["brand"]
+    description = columns["description"]
+    price = columns["price"]
+    categories = columns["categories"]
+    images = columns["images"]
+    uniq_id = columns["uniq_id"]
+    dimensions = columns.get("package_dimensions")
+    country = columns.get("country_of_origin")
+    material = columns.get("material")
+    color = columns.get("color")
+    width = max(columns.values()) + 1
+
+    products = []
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        products.append({
+            "id": 0,
+            "title": row[title].strip(),
+            "brand": row[brand].strip() or DEFAULT_BRAND,
+            "price": parse_price(row[price]),
+            "categories": parse_list(row[categories]),
+            "description": row[description].strip(),
+            "image_url": first_list_item(row[images]),
+            "rating": 0.0,
+            "features": [
+                row[index].strip() for index in (material, color)
+                if index is not None and row[index].strip()
+            ],
+            "specifications": ", ".join(
+                row[index].strip() for index in (dimensions, country)
+                if index is not None and row[index].strip()
+            ),
+            "uniq_id": row[uniq_id].strip(),
+        })
+    return products
+
+
+def _parse_range(path: str, start: int, end: int, columns: Dict[str, int]) -> List[dict]:
+    """Parse the records in a byte range of the file (runs in worker processes)"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = io.StringIO(data.decode("utf-8"), newline="")
+    return _convert_rows(csv.reader(text), columns)
+
+
+def _read_header(path: str) -> Tuple[Dict[str, int], int]:
+    """Column indexes and the byte offset where the first record starts"""
+    with open(path, "rb") as f:
+        line = f.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]))
+    return _column_indexes(header), len(line)
+
+
+def record_boundaries(path: str, start: int, chunk_bytes: int = CHUNK_BYTES) -> List[int]:
+    """
+    Byte offsets splitting the file into ranges of about chunk_bytes
+
+    A newline ends a record only outside quoted fields, i.e. when the number
+    of quote characters before it is even (escaped quotes come in pairs), so
+    the file is scanned once counting quotes.
+    """
+    size = os.path.getsize(path)
+    boundaries = [start]
+    target = start + chunk_bytes
+    quotes = 0
+    position = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        while target < size:
+            block = f.read(SCAN_BLOCK_BYTES)
+            if not block:
+                break
+            block_end = position + len(block)
+            search_from = 0
+            while target < block_end:
+                newline = block.find(b"\n", max(target - position, search_from))
+                if newline < 0:
+                    break
+                if (quotes + block.count(b'"', 0, newline)) % 2 == 0:
+                    boundaries.append(position + newline + 1)
+                    target = position + newline + 1 + chunk_bytes
+                else:
+                    search_from = newline + 1
+            quotes += block.count(b'"')
+            position = block_end
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return boundaries
+
+
+def iter_product_chunks(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[List[dict]]:
+    """
+    Stream products from a CSV export in chunks, in file order
+
+    Args:
+        path: CSV file path
+        workers: Worker processes (default: CPU count; 1 parses in-process).
+            Files under PARALLEL_MIN_BYTES are always parsed in-process.
+        chunk_bytes: Approximate size of the byte range per chunk
+
+    Returns:
+        Iterator of product lists with sequential IDs starting at 1
+    """
+    columns, start = _read_header(path)
+    boundaries = record_boundaries(path, start, chunk_bytes)
+    ranges = list(zip(boundaries[:-1], boundaries[1:]))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(ranges))
+
+    next_id = 1
+    if workers <= 1 or os.path.getsize(path) < PARALLEL_MIN_BYTES:
+        chunks = (_parse_range(path, first, last, columns) for first, last in ranges)
+        for chunk in chunks:
+            for product in chunk:
+                product["id"] = next_id
+                next_id += 1
+            yield chunk
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(_parse_range, [path] * len(ranges),
+                          [first for first, _ in ranges], [last for _, last in ranges],
+                          [columns] * len(ranges))
+        for chunk in chunks:
+            for product in chunk:
+                product["id"] = next_id
+                next_id += 1
+            yield chunk
+
+
+def load_products(path: str, workers: Optional[int] = None) -> List[dict]:
+    """Load every product of a CSV export (see iter_product_chunks)"""
+    products = []
+    for chunk in iter_product_chunks(path, workers):
+        products.extend(chunk)
+    return products
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(1)
+    from catalog_store import write_catalog
+    catalog = load_products(sys.argv[1])
+    write_catalog(catalog, sys.argv[2])
+    print(f"Wrote {len(catalog)} products to {sys.argv[2]}")
@@ -0,0 +1,394 @@
+"""
+SmartCart AI - Embedding Store
+Memory-mapped product embedding matrix with cosine top-k search
+
+Embeddings are written by the training notebook to the models directory:
+
+    text_embeddings.npy     float32 matrix, one row per product
+    embedding_ids.npy       int64 product ID per row (optional)
+    text_embeddings.ivf/    approximate nearest-neighbor index (optional, see ann_index.py)
+    text_embeddings.int8.npy, text_embeddings.int8_scales.npy
+    text_embeddings.float16.npy
+                            quantized copies of the unit-length rows (optional,
+                            see EmbeddingQuantizer in notebooks/notebook_utils.py)
+
+Without embedding_ids.npy, row i belongs to product ID i + 1, the numbering
+csv_loader.py gives the rows of intern_data_ikarus.csv. embedding_hashes.npz
+also records the fingerprint of the CSV rows the embeddings were computed
+for (see catalog_store.catalog_fingerprint); embeddings for another catalog
+are refused.
+
+Embeddings written by notebooks/embedding_pipeline.py have a content version
+(kept in embedding_hashes.npz, or a <name>.json file for fused embeddings).
+Files built from them record the version they were built from; an ANN index
+or quantized copy whose version no longer matches is ignored with a warning.
+
+int8 rows are stored as codes with one scale per dimension, so a row is
+approximately codes * scales. With quantized storage, searches score the
+quantized rows first and re-rank the best candidates at full precision.
+"""
+
+import json
+import os
+import shutil
+import warnings
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+MODELS_DIR = os.environ.get(
+    "SMARTCART_MODELS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+)
+EMBEDDINGS_FILE = os.environ.get("SMARTCART_EMBEDDINGS_FILE", "text_embeddings.npy")
+IDS_FILE = "embedding_ids.npy"
+TEXT_EMBEDDINGS_FILE = "text_embeddings.npy"
+HASHES_FILE = "embedding_hashes.npz"
+
+# Quantized copy used for the first scoring pass: "int8", "float16" or "" (none)
+EMBEDDINGS_QUANTIZATION = os.environ.get("SMARTCART_EMBEDDINGS_QUANTIZATION", "")
+QUANTIZATION_KINDS = ("int8", "float16")
+
+# Candidates from the quantized pass re-ranked at full precision
+RERANK_CANDIDATES = int(os.environ.get("SMARTCART_RERANK_CANDIDATES", "200"))
+
+# Sentence-Transformers model used to encode text queries (must match the
+# model that produced the embeddings, see notebooks/config.py)
+TEXT_MODEL_NAME = os.environ.get("SMARTCART_TEXT_MODEL", "all-MiniLM-L6-v2")
+
+# Rows processed at a time when computing row norms
+NORM_CHUNK_ROWS = 65536
+
+# Quantized rows converted to float32 at a time; small enough that each
+# converted chunk is scored while it is still in cache
+QUANTIZED_CHUNK_ROWS = 2048
+
+
+def row_norms(matrix: np.ndarray, chunk_rows: int = NORM_CHUNK_ROWS) -> np.ndarray:
+    """L2 norm of every row, computed in chunks so a mapped matrix is never copied whole"""
+    norms = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), chunk_rows):
+        chunk = np.asarray(matrix[start:start + chunk_rows], dtype=np.float32)
+        norms[start:start + len(chunk)] = np.sqrt(np.einsum("ij,ij->i", chunk, chunk))
+    return norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest scores, best first (ties by index)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class QuantizedEmbeddings:
+    """
+    Quantized unit-length embedding rows, scored in chunks.
+
+    Only one chunk at a time is converted to float32, so scoring never
+    needs a full-precision copy of the matrix. int8 rows score faster than
+    float32 ones; float16 rows halve memory but NumPy converts them slowly.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        """
+        Args:
+            codes: (n, dim) int8 codes or float16 rows
+            scales: Per-dimension int8 scales (None for float16 rows)
+        """
+        if (codes.dtype == np.int8) != (scales is not None):
+            raise ValueError("int8 codes need per-dimension scales, float16 rows none")
+        self.codes = codes
+        self.scales = None if scales is None else np.asarray(scales, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    def scores(self, queries: np.ndarray, chunk_rows: int = QUANTIZED_CHUNK_ROWS) -> np.ndarray:
+        """Approximate cosine similarity to unit-length queries, shape (m, n)"""
+        if self.scales is not None:
+            # codes * scales . q == codes . (q * scales)
+            queries = queries * self.scales
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), chunk_rows):
+            chunk = np.asarray(self.codes[start:start + chunk_rows], dtype=np.float32)
+            scores[:, start:start + len(chunk)] = queries @ chunk.T
+        return scores
+
+
+class EmbeddingStore:
+    """
+    Product embeddings with cosine similarity search.
+
+    The matrix is used as given (typically a read-only memory map, shared
+    between worker processes); only the per-row norms are held in memory.
+    With an ANN index, searches scan only the index lists closest to the
+    query; with quantized storage, they score the quantized rows and re-rank
+    the best candidates at full precision. exact=True scans every row.
+    """
+
+    def __init__(self, embeddings: np.ndarray, product_ids: Optional[np.ndarray] = None,
+                 ann=None, quantized: Optional[QuantizedEmbeddings] = None,
+                 rerank_candidates: int = RERANK_CANDIDATES):
+        """
+        Args:
+            embeddings: (n, dim) float32 matrix
+            product_ids: Product ID per row (default: row + 1)
+            ann: Approximate index over the same rows (see ann_index.IVFIndex)
+            quantized: Quantized copy of the rows for the first scoring pass
+            rerank_candidates: Candidates re-ranked after the quantized pass
+        """
+        if embeddings.ndim != 2:
+            raise ValueError("Embeddings must be a 2-D matrix")
+        if product_ids is None:
+            product_ids = np.arange(1, len(embeddings) + 1, dtype=np.int64)
+        if len(product_ids) != len(embeddings):
+            raise ValueError("Expected one product ID per embedding row")
+        self.embeddings = embeddings
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.ann = ann
+        if quantized is not None and len(quantized) != len(embeddings):
+            raise ValueError("Quantized embeddings must have the same rows")
+        self.quantized = quantized
+        self.rerank_candidates = rerank_candidates
+        self._inverse_norms = None
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    @property
+    def inverse_norms(self) -> np.ndarray:
+        """1 / L2 norm of every row (computed on first exact search)"""
+        if self._inverse_norms is None:
+            norms = row_norms(self.embeddings)
+            norms[norms == 0] = 1.0
+            self._inverse_norms = 1.0 / norms
+        return self._inverse_norms
+
+    def check_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Queries as a float32 (m, dim) matrix of unit vectors"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query vectors must have {self.dim} dimensions")
+        if not np.all(np.isfinite(queries)):
+            raise ValueError("Query vectors must be finite")
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return queries / norms
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every product to every query, shape (m, n)"""
+        queries = self.check_queries(queries)
+        return (queries @ self.embeddings.T) * self.inverse_norms
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k search for a batch of queries
+
+        Args:
+            exact: Score every product even if an ANN index is available
+
+        Returns:
+            (product IDs, cosine scores), each of shape (m, min(k, n))
+        """
+        if self.ann is not None and not exact:
+            rows, scores = self.ann.search_batch(self.check_queries(queries), min(k, len(self)))
+            # Rows are -1 where the probed lists held fewer than k vectors
+            found = np.all(rows >= 0, axis=0)
+            return self.product_ids[rows[:, found]], scores[:, found]
+        if self.quantized is not None and not exact:
+            return self._search_quantized(self.check_queries(queries), k)
+        scores = self.scores(queries)
+        rows = np.array([top_k(query_scores, k) for query_scores in scores], dtype=np.int64)
+        rows = rows.reshape(len(scores), -1)
+        return self.product_ids[rows], np.take_along_axis(scores, rows, axis=1)
+
+    def _search_quantized(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Quantized first pass, then exact cosine re-ranking of the top candidates"""
+        k = min(k, len(self))
+        n_candidates = max(k, self.rerank_candidates)
+        ids = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for index, (query, approximate) in enumerate(zip(queries, self.quantized.scores(queries))):
+            candidates = np.sort(top_k(approximate, n_candidates))
+            rows = np.asarray(self.embeddings[candidates], dtype=np.float32)
+            norms = np.linalg.norm(rows, axis=1)
+            norms[norms == 0] = 1.0
+            exact_scores = (rows @ query) / norms
+            best = top_k(exact_scores, k)
+            ids[index] = self.product_ids[candidates[best]]
+            scores[index] = exact_scores[best]
+        return ids, scores
+
+    def search(self, query: np.ndarray, k: int,
+               exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k search for one query vector: (product IDs, cosine scores)"""
+        ids, scores = self.search_batch(query, k, exact)
+        return ids[0], scores[0]
+
+
+def replace_directory(path: str, write: Callable[[str], None]):
+    """
+    Write a directory through a temporary sibling and rename it into place
+
+    write(directory) fills the new directory. The previous one is moved
+    aside and deleted, never rewritten, so a process that has its files
+    mapped keeps reading them unchanged.
+    """
+    path = os.path.normpath(path)
+    temporary, previous = path + ".tmp", path + ".old"
+    for leftover in (temporary, previous):
+        shutil.rmtree(leftover, ignore_errors=True)
+    os.makedirs(temporary)
+    write(temporary)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(temporary, path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def read_params(path: str) -> dict:
+    """Parameters from a JSON file, or {} if there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def embeddings_version(models_dir: str = MODELS_DIR, filename: str = EMBEDDINGS_FILE) -> Optional[str]:
+    """
+    Content version of an embeddings file, or None if it has none
+
+    text_embeddings.npy has its version in embedding_hashes.npz; fused
+    embeddings have theirs in a <name>.json file next to them.
+    """
+    stem = os.path.join(models_dir, os.path.splitext(filename)[0])
+    version = read_params(f"{stem}.json").get("version")
+    if version is not None or filename != TEXT_EMBEDDINGS_FILE:
+        return version
+    path = os.path.join(models_dir, HASHES_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return str(saved["version"]) if "version" in saved.files else None
+
+
+def embeddings_catalog(models_dir: str = MODELS_DIR) -> Optional[str]:
+    """Fingerprint of the catalog the embeddings were computed for, or None if not recorded"""
+    path = os.path.join(models_dir, HASHES_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return str(saved["catalog"]) if "catalog" in saved.files else None
+
+
+def is_stale(params: dict, version: Optional[str]) -> bool:
+    """Whether a file built with params was built from other embeddings than version"""
+    return version is not None and params.get("embeddings_version") != version
+
+
+def load_quantized(models_dir: str, filename: str, kind: str) -> QuantizedEmbeddings:
+    """Open the quantized copy of an embeddings file as a memory map"""
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"Unknown quantization {kind!r}, expected one of {QUANTIZATION_KINDS}")
+    stem = os.path.join(models_dir, os.path.splitext(filename)[0])
+    codes = np.load(f"{stem}.{kind}.npy", mmap_mode="r")
+    scales = np.load(f"{stem}.{kind}_scales.npy") if kind == "int8" else None
+    return QuantizedEmbeddings(codes, scales)
+
+
+def load_embedding_store(models_dir: str = MODELS_DIR,
+                         filename: str = EMBEDDINGS_FILE,
+                         quantization: str = EMBEDDINGS_QUANTIZATION,
+                         catalog: Optional[str] = None) -> EmbeddingStore:
+    """
+    Open the embedding matrix in a models directory as a memory map
+
+    Args:
+        quantization: Quantized copy to score first ("int8", "float16" or "")
+        catalog: Fingerprint of the served catalog (see
+            catalog_store.catalog_fingerprint), checked against the one
+            recorded with the embeddings; None skips the check
+
+    Raises:
+        FileNotFoundError: If the embeddings file (or the requested
+            quantized copy) does not exist
+        ValueError: If the embeddings were computed for another catalog, or
+            fused embeddings were built from other text embeddings than the
+            current ones
+    """
+    stem = os.path.join(models_dir, os.path.splitext(filename)[0])
+    params = read_params(f"{stem}.json")
+    if "embeddings_version" in params and is_stale(params, embeddings_version(models_dir, TEXT_EMBEDDINGS_FILE)):
+        raise ValueError(f"{filename} was built from other text embeddings; rebuild it")
+    version = embeddings_version(models_dir, filename)
+    embeddings = np.load(os.path.join(models_dir, filename), mmap_mode="r")
+    if embeddings.dtype != np.float32:
+        raise ValueError(f"{filename} must hold float32 embeddings, not {embeddings.dtype}")
+    if catalog is not None:
+        recorded = embeddings_catalog(models_dir)
+        if recorded is None:
+            warnings.warn(f"{filename} does not record the catalog it was computed for; "
+                          f"re-export it so it can be checked against the served catalog")
+        elif recorded != catalog:
+            raise ValueError(f"{filename} was computed for another catalog; "
+                             f"re-export the embeddings for the served catalog")
+    ids_path = os.path.join(models_dir, IDS_FILE)
+    product_ids = np.load(ids_path) if os.path.exists(ids_path) else None
+
+    from ann_index import load_ivf_index
+    ann = load_ivf_index(models_dir, filename)
+    if ann is not None and (len(ann) != len(embeddings) or ann.dim != embeddings.shape[1]
+                            or is_stale(ann.params, version)):
+        warnings.warn(f"Ignoring ANN index for {filename}: it was built for different embeddings")
+        ann = None
+    quantized = None
+    if quantization:
+        quantized = load_quantized(models_dir, filename, quantization)
+        if is_stale(read_params(f"{stem}.{quantization}.json"), version):
+            warnings.warn(f"Ignoring {quantization} copy of {filename}: it was built for different embeddings")
+            quantized = None
+    return EmbeddingStore(embeddings, product_ids, ann, quantized)
+
+
+class TextEncoder:
+    """
+    Encodes query text with Sentence-Transformers.
+
+    The model is loaded on first use; sentence-transformers is an optional
+    dependency of the backend.
+    """
+
+    def __init__(self, model_name: str = TEXT_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+
+    @staticmethod
+    def available() -> bool:
+        """Whether sentence-transformers is installed"""
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Unit-length float32 embeddings of texts, shape (len(texts), dim)"""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
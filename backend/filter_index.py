@@ -0,0 +1,173 @@
+"""
+SmartCart AI - Attribute Filter Index
+Columnar indexes for category/brand/price/rating filters
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalog_store import catalog_columns
+
+# Smallest chunk scanned when collecting the first matches of a filter mask
+MIN_SCAN_CHUNK = 4096
+
+
+class FilterIndex:
+    """
+    Per-attribute indexes over the product catalog.
+
+    Products are laid out in "slots" ordered by rating (descending, ties in
+    catalog order), which is the order filter-only requests are returned in:
+
+    - category and brand bitmaps (boolean masks over slots)
+    - ratings in slot order, so a minimum rating is a slot prefix found by
+      binary search
+    - prices sorted ascending plus each slot's price rank, so a price range
+      is a rank range found by binary search
+
+    Filters combine by intersecting the bitmaps, and the first matching slots
+    are already the highest rated products. Ratings are also kept in catalog
+    order, so ranking by rating never decodes a product.
+    """
+
+    def __init__(self, products: List[dict]):
+        columns = catalog_columns(products)
+        n = len(columns.prices)
+        ratings = np.asarray(columns.ratings, dtype=np.float64)
+        prices = np.asarray(columns.prices, dtype=np.float64)
+        self.ratings = ratings
+
+        # Slot -> catalog position, and catalog position -> slot
+        self.order = np.argsort(-ratings, kind='stable')
+        self.slot_of = np.empty(n, dtype=np.int64)
+        self.slot_of[self.order] = np.arange(n)
+
+        # Negated ratings in slot order are ascending, as binary search needs
+        self._negated_ratings = -ratings[self.order]
+
+        slot_prices = prices[self.order]
+        price_order = np.argsort(slot_prices, kind='stable')
+        self._sorted_prices = slot_prices[price_order]
+        self._price_rank = np.empty(n, dtype=np.int32)
+        self._price_rank[price_order] = np.arange(n, dtype=np.int32)
+
+        self._category_bitmaps = self._bitmaps(
+            columns.categories, columns.category_codes, columns.category_products, n
+        )
+        self._brand_bitmaps = self._bitmaps(
+            columns.brands, columns.brand_codes, np.arange(n, dtype=np.int64), n
+        )
+
+    def _bitmaps(self, names: List[str], codes: np.ndarray, positions: np.ndarray,
+                 n: int) -> Dict[str, np.ndarray]:
+        """Slot bitmap per attribute value from (position, value code) pairs"""
+        codes = np.asarray(codes, dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        slots = self.slot_of[positions[order]]
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        bitmaps = {}
+        for code, name in enumerate(names):
+            bitmap = np.zeros(n, dtype=bool)
+            bitmap[slots[bounds[code]:bounds[code + 1]]] = True
+            bitmaps[name] = bitmap
+        return bitmaps
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def filter(
+        self,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Build the mask of products passing all filters
+
+        Returns:
+            None when no filter is set, otherwise a boolean mask over the
+            leading slots (slots past its end never match)
+        """
+        if not category and not brand and min_price is None \
+                and max_price is None and min_rating is None:
+            return None
+
+        # Minimum rating: products rated >= min_rating form a slot prefix
+        end = len(self)
+        if min_rating is not None:
+            end = int(np.searchsorted(self._negated_ratings, -min_rating, side='right'))
+
+        mask = np.ones(end, dtype=bool)
+
+        if category:
+            bitmap = self._category_bitmaps.get(category)
+            if bitmap is None:
+                return np.zeros(0, dtype=bool)
+            mask &= bitmap[:end]
+
+        if brand:
+            bitmap = self._brand_bitmaps.get(brand)
+            if bitmap is None:
+                return np.zeros(0, dtype=bool)
+            mask &= bitmap[:end]
+
+        # Price range: binary search the sorted prices for a rank range
+        low, high = 0, len(self)
+        if min_price is not None:
+            low = int(np.searchsorted(self._sorted_prices, min_price, side='left'))
+        if max_price is not None:
+            high = int(np.searchsorted(self._sorted_prices, max_price, side='right'))
+        if low > 0 or high < len(self):
+            ranks = self._price_rank[:end]
+            mask &= ranks >= low
+            mask &= ranks < high
+
+        return mask
+
+    def accepts(self, mask: Optional[np.ndarray], positions: List[int]) -> List[int]:
+        """Keep the catalog positions that pass a filter mask (order preserved)"""
+        if mask is None:
+            return list(positions)
+        positions = np.asarray(positions, dtype=np.int64)
+        slots = self.slot_of[positions]
+        inside = slots < len(mask)
+        keep = np.zeros(len(positions), dtype=bool)
+        keep[inside] = mask[slots[inside]]
+        return positions[keep].tolist()
+
+    def top_by_rating(self, mask: Optional[np.ndarray], limit: int) -> Tuple[np.ndarray, int]:
+        """
+        Highest rated products passing a filter mask
+
+        Args:
+            mask: Mask from filter()
+            limit: Number of results (negative values drop results from the
+                end, like slicing a sorted list)
+
+        Returns:
+            (catalog positions ordered by rating as an int64 array, total
+            number of matches)
+        """
+        total = len(self) if mask is None else int(np.count_nonzero(mask))
+        wanted = limit if limit >= 0 else max(total + limit, 0)
+        wanted = min(wanted, total)
+
+        if mask is None:
+            slots = np.arange(wanted)
+        else:
+            # Scan growing chunks until enough matches have been collected
+            chunks = []
+            start = 0
+            step = max(MIN_SCAN_CHUNK, wanted)
+            while wanted > 0 and start < len(mask):
+                chunk = np.flatnonzero(mask[start:start + step])[:wanted] + start
+                chunks.append(chunk)
+                wanted -= len(chunk)
+                start += step
+                step *= 2
+            slots = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+        return self.order[slots], total
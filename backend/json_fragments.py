@@ -0,0 +1,55 @@
+"""
+SmartCart AI - Pre-serialized JSON Fragments
+Per-product JSON bytes cached per catalog version, for assembling responses without re-validation
+"""
+
+import json
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from pydantic import BaseModel
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, formatted like FastAPI's JSONResponse"""
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FragmentCache:
+    """
+    JSON bytes of catalog products, keyed by product ID.
+
+    Each product is validated against the response model and serialized
+    once; responses are then assembled by joining cached fragments. A
+    fragment is reused for the same product or an equal copy (mapped
+    catalogs decode a fresh dict per access). All fragments are dropped
+    when the catalog version changes.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self._model = model
+        self._version = None
+        self._fragments: Dict[int, Tuple[dict, bytes]] = {}
+
+    def fragment(self, product: dict, version: Any) -> bytes:
+        """JSON bytes of a single product"""
+        if version != self._version:
+            self._fragments.clear()
+            self._version = version
+        entry = self._fragments.get(product['id'])
+        if entry is None or not (entry[0] is product or entry[0] == product):
+            entry = (product, self._model.model_validate(product).model_dump_json().encode("utf-8"))
+            self._fragments[product['id']] = entry
+        return entry[1]
+
+    def serialize(self, product: dict, version: Any) -> bytes:
+        """JSON bytes of a product, reusing a cached fragment but never adding one"""
+        entry = self._fragments.get(product['id']) if version == self._version else None
+        if entry is not None and (entry[0] is product or entry[0] == product):
+            return entry[1]
+        return self._model.model_validate(product).model_dump_json().encode("utf-8")
+
+    def array(self, products: Iterable[dict], version: Any) -> bytes:
+        """JSON array of products"""
+        return b"[" + b",".join(self.fragment(product, version) for product in products) + b"]"
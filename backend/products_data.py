@@ -3,6 +3,13 @@ SmartCart AI - Electronics Product Database
 Contains 300+ electronics products across multiple categories
 """
 
+import os
+import threading
+from collections.abc import Sequence
+
+from catalog_store import MappedCatalog, open_catalog
+from csv_loader import load_products
+
 PRODUCTS = [
     # Smartphones (50 products)
     {
@@ -861,27 +868,256 @@ PRODUCTS = [
     }
 ]
 
+def normalize_product(product: dict) -> dict:
+    """
+    Build the lowercased, tokenized view of a product used for scoring
+    
+    Search matching is case-insensitive, so every text field is lowercased
+    once here instead of on every request.
+    """
+    title = product["title"].lower()
+    description = product["description"].lower()
+    features = [feature.lower() for feature in product["features"]]
+    features_text = " ".join(features)
+    return {
+        "id": product["id"],
+        "title": title,
+        "title_words": frozenset(title.split()),
+        "description": description,
+        "description_words": frozenset(description.split()),
+        "features": features,
+        "features_text": features_text,
+        "feature_words": frozenset(features_text.split()),
+        "categories": [category.lower() for category in product["categories"]],
+        "brand": product["brand"].lower(),
+        "specifications": product["specifications"].lower(),
+    }
+
+class _NormalizedView(Sequence):
+    """Normalized products of a mapped catalog, computed on access"""
+    
+    def __init__(self, products):
+        self._products = products
+    
+    def __len__(self):
+        return len(self._products)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [normalize_product(product) for product in self._products[index]]
+        return normalize_product(self._products[index])
+
+# Optional catalog source replacing the bundled products: a compiled catalog
+# file (see catalog_store.py), memory-mapped so worker processes share it, or
+# a CSV export (see csv_loader.py), loaded into memory.
+CATALOG_PATH = os.environ.get("SMARTCART_CATALOG_PATH")
+
+def load_catalog_source(path: str):
+    """Products from a catalog source file (CSV export or compiled catalog)"""
+    if path.lower().endswith(".csv"):
+        return load_products(path)
+    return open_catalog(path)
+
+if CATALOG_PATH:
+    PRODUCTS = load_catalog_source(CATALOG_PATH)
+
+class Catalog:
+    """
+    One version of the catalog: the products plus their lookup structures.
+    
+    A published catalog is never modified. Changes build a new Catalog
+    (copying references, not product dicts) and publish it by swapping a
+    single module reference, so a reader holding a Catalog always sees
+    products, normalized view and ID lookups that agree with each other.
+    """
+    
+    def __init__(self, products, normalized=None):
+        """
+        Args:
+            products: Product list or mapped catalog
+            normalized: Normalized view of the same products, in the same
+                order (computed if omitted)
+        """
+        self.products = products
+        self.version = 0  # assigned when published
+        self._derived = {}
+        if isinstance(products, MappedCatalog):
+            # Product dicts are decoded on access instead of being held in memory
+            self.normalized = _NormalizedView(products) if normalized is None else normalized
+            self._products_by_id = None
+            self._normalized_by_id = None
+        else:
+            if normalized is None:
+                normalized = [normalize_product(product) for product in products]
+            self.normalized = normalized
+            # ID -> product hash indexes
+            self._products_by_id = {product["id"]: product for product in products}
+            if len(self._products_by_id) != len(products):
+                raise ValueError("Product IDs must be unique")
+            self._normalized_by_id = {entry["id"]: entry for entry in normalized}
+    
+    def __len__(self):
+        return len(self.products)
+    
+    def get(self, product_id: int):
+        """Product with an ID, or None"""
+        if self._products_by_id is None:
+            return self.products.get_by_id(product_id)
+        return self._products_by_id.get(product_id)
+    
+    def get_normalized(self, product_id: int):
+        """Normalized view of the product with an ID, or None"""
+        if self._normalized_by_id is None:
+            product = self.get(product_id)
+            return None if product is None else normalize_product(product)
+        return self._normalized_by_id.get(product_id)
+    
+    def position_of(self, product_id: int):
+        """Position of the product with an ID, or None"""
+        if self._products_by_id is None:
+            return self.products.position_of(product_id)
+        product = self._products_by_id.get(product_id)
+        if product is None:
+            return None
+        for position, candidate in enumerate(self.products):
+            if candidate is product:
+                return position
+        return None
+    
+    def cached(self, name: str, compute):
+        """Value derived from this catalog, computed on first use"""
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+
+# The published catalog. PRODUCTS and NORMALIZED_PRODUCTS are kept as
+# aliases of its contents.
+_catalog = Catalog(PRODUCTS)
+NORMALIZED_PRODUCTS = _catalog.normalized
+
+# Held while a new catalog is built from the current one and published, so
+# concurrent changes are applied one after another. Readers never take it.
+write_lock = threading.RLock()
+
+def get_catalog():
+    """The current catalog (a consistent snapshot, never modified)"""
+    return _catalog
+
 def get_all_products():
     """Return all products"""
-    return PRODUCTS
+    return _catalog.products
 
 def get_product_by_id(product_id: int):
     """Get a specific product by ID"""
-    for product in PRODUCTS:
-        if product["id"] == product_id:
-            return product
-    return None
+    return _catalog.get(product_id)
 
-def get_categories():
-    """Get unique categories"""
+def _compute_categories(catalog):
     categories = set()
-    for product in PRODUCTS:
+    for product in catalog.products:
         categories.update(product["categories"])
     return sorted(list(categories))
 
-def get_brands():
-    """Get unique brands"""
+def _compute_brands(catalog):
     brands = set()
-    for product in PRODUCTS:
+    for product in catalog.products:
         brands.add(product["brand"])
     return sorted(list(brands))
+
+def get_categories():
+    """Get unique categories (cached per catalog version, do not modify)"""
+    catalog = _catalog
+    return catalog.cached("categories", lambda: _compute_categories(catalog))
+
+def get_brands():
+    """Get unique brands (cached per catalog version, do not modify)"""
+    catalog = _catalog
+    return catalog.cached("brands", lambda: _compute_brands(catalog))
+
+def get_normalized_product(product_id: int):
+    """Get the normalized view of a specific product by ID"""
+    return _catalog.get_normalized(product_id)
+
+# Callbacks notified of catalog changes as listener(old_product, new_product);
+# old_product is None for additions and new_product is None for removals.
+# Listeners run after the new catalog is published, while write_lock is held.
+_listeners = []
+
+def subscribe(listener):
+    """Register a callback for catalog changes"""
+    _listeners.append(listener)
+
+def _publish(catalog: Catalog):
+    """Make a catalog current with a single reference swap"""
+    global _catalog, PRODUCTS, NORMALIZED_PRODUCTS
+    catalog.version = _catalog.version + 1
+    _catalog = catalog
+    PRODUCTS = catalog.products
+    NORMALIZED_PRODUCTS = catalog.normalized
+
+def _notify(old_product, new_product):
+    for listener in _listeners:
+        listener(old_product, new_product)
+
+def replace_catalog(catalog: Catalog):
+    """
+    Publish a prepared catalog in place of the current one
+    
+    Build the Catalog (and anything derived from it) beforehand; publishing
+    only swaps the reference. Listeners are not called for a replacement;
+    hold write_lock to publish derived state together with the catalog.
+    """
+    with write_lock:
+        _publish(catalog)
+    return catalog
+
+def add_product(product: dict):
+    """Add a product to the catalog"""
+    with write_lock:
+        catalog = _catalog
+        if catalog.get(product["id"]) is not None:
+            raise ValueError(f"Product {product['id']} already exists")
+        _publish(Catalog(
+            list(catalog.products) + [product],
+            list(catalog.normalized) + [normalize_product(product)]
+        ))
+        _notify(None, product)
+    return product
+
+def update_product(product_id: int, changes: dict):
+    """
+    Change fields of a product
+    
+    The stored product is replaced by an updated copy, so references to the
+    old product keep seeing its previous values.
+    """
+    with write_lock:
+        catalog = _catalog
+        position = catalog.position_of(product_id)
+        if position is None:
+            raise KeyError(product_id)
+        if changes.get("id", product_id) != product_id:
+            raise ValueError("Product ID cannot be changed")
+        products = list(catalog.products)
+        normalized = list(catalog.normalized)
+        old_product = products[position]
+        new_product = {**old_product, **changes}
+        products[position] = new_product
+        normalized[position] = normalize_product(new_product)
+        _publish(Catalog(products, normalized))
+        _notify(old_product, new_product)
+    return new_product
+
+def remove_product(product_id: int):
+    """Remove a product from the catalog"""
+    with write_lock:
+        catalog = _catalog
+        position = catalog.position_of(product_id)
+        if position is None:
+            raise KeyError(product_id)
+        products = list(catalog.products)
+        normalized = list(catalog.normalized)
+        old_product = products.pop(position)
+        normalized.pop(position)
+        _publish(Catalog(products, normalized))
+        _notify(old_product, None)
+    return old_product
@@ -0,0 +1,87 @@
+"""
+SmartCart AI - Response Cache
+In-process LRU/TTL cache for computed API results, invalidated by catalog version
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache with a per-entry time to live.
+
+    Entries belong to the catalog version they were computed for: looking
+    up or storing a result for a different version drops everything cached
+    for the previous one. Operations are atomic, so requests served from
+    different catalog snapshots never see each other's entries.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            capacity: Maximum number of entries (0 disables caching)
+            ttl: Seconds an entry stays valid (0 or less means no expiry)
+            clock: Time source, monotonic seconds
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: Any):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        """Cached value for a key at a catalog version, or None"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: Any, value: Any):
+        """Store a value computed at a catalog version"""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            expires = self._clock() + self.ttl if self.ttl > 0 else None
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
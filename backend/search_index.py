@@ -0,0 +1,231 @@
+"""
+SmartCart AI - Inverted Search Index
+Token -> posting lists built once from the catalog so queries only score candidate products
+
+The index is a set of flat arrays (see build_index_arrays): the token
+vocabulary as one newline-separated UTF-8 buffer, and per field a CSR
+posting list (indptr over tokens, sorted unique values). Compiled catalogs
+store these arrays as sections of the catalog file, so server workers map
+them instead of tokenizing the catalog at startup.
+"""
+
+import warnings
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from catalog_store import MappedCatalog
+from products_data import normalize_product
+
+# Field weights (kept in sync with calculate_relevance_score in api.py)
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 2.0
+CATEGORY_WEIGHT = 2.0
+BRAND_WEIGHT = 1.0
+FEATURE_WEIGHT = 1.0
+SPECIFICATIONS_WEIGHT = 1.0
+
+# Indexed fields. Postings hold catalog positions, except for features and
+# categories, which hold entry numbers (one per product feature / category,
+# mapped to positions by "<field>.product")
+FIELDS = ("title", "description", "features", "categories", "brand", "specifications")
+
+# Upper bound on memoized query word -> matching token lookups
+MATCH_CACHE_SIZE = 10000
+
+
+def _postings(tokens: array, values: array, n_tokens: int):
+    """CSR (indptr, sorted unique values per token) from (token, value) pairs"""
+    tokens = np.frombuffer(tokens, dtype=np.int64)
+    values = np.frombuffer(values, dtype=np.int64)
+    span = int(values.max()) + 1 if len(values) else 1
+    keys = np.unique(tokens * span + values)
+    tokens, values = keys // span, keys % span
+    indptr = np.zeros(n_tokens + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tokens, minlength=n_tokens), out=indptr[1:])
+    return indptr, values.astype(np.int32 if span <= 2 ** 31 else np.int64)
+
+
+def build_index_arrays(products: Sequence[dict],
+                       normalized: Optional[Sequence[dict]] = None) -> Dict[str, np.ndarray]:
+    """
+    Index arrays for a catalog
+
+    Products are normalized one at a time when no normalized view is given,
+    and (token, value) pairs are collected in flat arrays, so a large mapped
+    catalog is never held in memory as dicts.
+    """
+    vocabulary: Dict[str, int] = {}
+    pairs = {field: (array("q"), array("q")) for field in FIELDS}
+    entry_products = {"features": array("q"), "categories": array("q")}
+
+    def add(field: str, tokens, value: int):
+        field_tokens, field_values = pairs[field]
+        for token in tokens:
+            field_tokens.append(vocabulary.setdefault(token, len(vocabulary)))
+            field_values.append(value)
+
+    for position, product in enumerate(products):
+        entry = normalize_product(product) if normalized is None else normalized[position]
+        add("title", entry["title_words"], position)
+        add("description", entry["description_words"], position)
+        for field in ("features", "categories"):
+            for text in entry[field]:
+                add(field, text.split(), len(entry_products[field]))
+                entry_products[field].append(position)
+        add("brand", entry["brand"].split(), position)
+        add("specifications", entry["specifications"].split(), position)
+
+    encoded = [token.encode("utf-8") + b"\n" for token in vocabulary]
+    token_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(token) for token in encoded], out=token_offsets[1:])
+    arrays = {
+        "vocabulary": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "token_offsets": token_offsets,
+    }
+    for field in FIELDS:
+        arrays[f"{field}.indptr"], arrays[f"{field}.postings"] = _postings(*pairs[field], len(vocabulary))
+    for field, positions in entry_products.items():
+        arrays[f"{field}.product"] = np.frombuffer(positions, dtype=np.int64).astype(np.int32)
+    return arrays
+
+
+class InvertedIndex:
+    """
+    Inverted index over the product catalog.
+
+    The scorer in api.py matches query words as substrings of each field.
+    A query word never contains whitespace, so it is a substring of a field
+    exactly when it is a substring of one of the field's whitespace-separated
+    tokens. Matching query words against the token vocabulary therefore gives
+    the same hits as scanning every product, while only touching products
+    that share a token with the query.
+
+    Whole-query fields (categories, brand, specifications) of single-word
+    queries are scored from the postings too; longer queries are checked
+    against the normalized products that contain every query word, which
+    are the only ones decoded.
+    """
+
+    def __init__(self, products: Sequence[dict], normalized: Optional[Sequence[dict]] = None,
+                 arrays: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            products: Catalog products
+            normalized: Precomputed normalized view of the same products
+                (see products_data.normalize_product), computed if omitted
+            arrays: Index arrays from build_index_arrays (default: the ones
+                stored in a compiled catalog, otherwise built here)
+        """
+        self.size = len(products)
+        if normalized is None:
+            normalized = [normalize_product(product) for product in products]
+        self.normalized = normalized
+        if arrays is None and isinstance(products, MappedCatalog):
+            arrays = products.search_arrays()
+            if arrays is None:
+                warnings.warn(f"{products.path} has no stored search index; building it in "
+                              f"this process (recompile it with catalog_store.py)")
+        if arrays is None:
+            arrays = build_index_arrays(products, normalized)
+        self._vocabulary = arrays["vocabulary"].tobytes()
+        self._token_offsets = arrays["token_offsets"]
+        self._arrays = arrays
+        self._match_cache: Dict[str, np.ndarray] = {}
+
+    def _matching_tokens(self, word: str) -> np.ndarray:
+        """IDs of every vocabulary token that contains the query word"""
+        tokens = self._match_cache.get(word)
+        if tokens is None:
+            needle = word.encode("utf-8")
+            find = self._vocabulary.find
+            starts = []
+            start = find(needle)
+            while start >= 0:
+                starts.append(start)
+                # Continue after the end of the matching token
+                start = find(needle, find(b"\n", start) + 1)
+            tokens = np.searchsorted(self._token_offsets, starts, side="right") - 1
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[word] = tokens
+        return tokens
+
+    def _hits(self, field: str, tokens: np.ndarray) -> np.ndarray:
+        """Unique postings of a field over a set of tokens"""
+        indptr = self._arrays[f"{field}.indptr"]
+        starts = indptr[tokens]
+        lengths = indptr[tokens + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        return np.unique(self._arrays[f"{field}.postings"][offsets])
+
+    def search(self, query: str) -> Dict[int, float]:
+        """
+        Score candidate products for a query
+
+        Returns:
+            Mapping of catalog position -> relevance score, only for products
+            with a positive score (identical to calculate_relevance_score)
+        """
+        query_lower = query.lower()
+        query_words = query_lower.split()
+        single_word = query_words == [query_lower]
+        positions: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+
+        def add(hits: np.ndarray, weight):
+            positions.append(hits)
+            weights.append(np.broadcast_to(np.float64(weight), hits.shape))
+
+        # Whole-query fields can only match products containing every query word
+        phrase_candidates = None
+
+        for word in query_words:
+            tokens = self._matching_tokens(word)
+            add(self._hits("title", tokens), TITLE_WEIGHT)
+            add(self._hits("description", tokens), DESCRIPTION_WEIGHT)
+            add(self._arrays["features.product"][self._hits("features", tokens)], FEATURE_WEIGHT)
+
+            categories = self._arrays["categories.product"][self._hits("categories", tokens)]
+            brand = self._hits("brand", tokens)
+            specifications = self._hits("specifications", tokens)
+            if single_word:
+                # The query is this word: a field contains it exactly when
+                # one of its tokens does
+                add(categories, CATEGORY_WEIGHT)
+                add(brand, BRAND_WEIGHT)
+                add(specifications, SPECIFICATIONS_WEIGHT)
+                continue
+            hits = np.unique(np.concatenate([categories, brand, specifications]))
+            phrase_candidates = hits if phrase_candidates is None \
+                else np.intersect1d(phrase_candidates, hits, assume_unique=True)
+
+        if not single_word:
+            if phrase_candidates is None:
+                # Whitespace-only query: no tokens to narrow the search with
+                phrase_candidates = np.arange(self.size)
+            phrase_positions, phrase_scores = [], []
+            for position in phrase_candidates.tolist():
+                normalized = self.normalized[position]
+                score = 0.0
+                for category in normalized['categories']:
+                    if query_lower in category:
+                        score += CATEGORY_WEIGHT
+                if query_lower in normalized['brand']:
+                    score += BRAND_WEIGHT
+                if query_lower in normalized['specifications']:
+                    score += SPECIFICATIONS_WEIGHT
+                if score:
+                    phrase_positions.append(position)
+                    phrase_scores.append(score)
+            add(np.array(phrase_positions, dtype=np.int64), np.array(phrase_scores))
+
+        if not positions:
+            return {}
+        scored, inverse = np.unique(np.concatenate(positions).astype(np.int64), return_inverse=True)
+        totals = np.bincount(inverse.reshape(-1), weights=np.concatenate(weights))
+        return dict(zip(scored.tolist(), totals.tolist()))
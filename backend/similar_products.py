@@ -0,0 +1,331 @@
+"""
+SmartCart AI - Similar Products
+Precomputed top-N neighbor table behind /api/products/{id}/similar
+
+Neighbors come from embedding cosine similarity for products that have an
+embedding, and from shared categories, features and brand (IDF weighted)
+for the rest. Embedding neighbors are computed in row x column blocks, so
+the full N x N similarity matrix is never materialized.
+
+Table layout (models/similar_products/):
+    product_ids.npy     int64 (n), sorted
+    neighbors.npy       int64 (n, N), neighbor product IDs, best first, -1 padded
+    scores.npy          float32 (n, N)
+    sources.npy         uint8 (n), 1 = embeddings, 0 = shared attributes
+    params.json         build parameters, including the version of the
+                        embeddings used (see embedding_store.embeddings_version)
+
+The table is written to a temporary directory that replaces the previous
+one, so a server with the old table mapped keeps serving it unchanged.
+
+Usage (from backend/):
+    python similar_products.py [--neighbors N]    # neighbors for the configured catalog
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_store import (
+    MODELS_DIR, EmbeddingStore, embeddings_version, is_stale, read_params, replace_directory, top_k
+)
+
+TABLE_DIR = os.path.join(MODELS_DIR, "similar_products")
+DEFAULT_NEIGHBORS = 20
+
+# Query rows and candidate columns scored per block of the similarity matrix
+ROW_BLOCK = 1024
+COLUMN_BLOCK = 65536
+
+# Attribute tokens shared by more products than this carry too little
+# signal to be worth scanning (unless a product has nothing else)
+MAX_POSTINGS = 10000
+
+SOURCE_ATTRIBUTES = 0
+SOURCE_EMBEDDINGS = 1
+SOURCE_NAMES = {SOURCE_ATTRIBUTES: "attributes", SOURCE_EMBEDDINGS: "embeddings"}
+
+
+def _merge_top(best_scores: np.ndarray, best_columns: np.ndarray,
+               scores: np.ndarray, columns: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the n highest scores per row out of two candidate sets"""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_columns = np.concatenate([best_columns, columns], axis=1)
+    if all_scores.shape[1] > n:
+        keep = np.argpartition(-all_scores, n - 1, axis=1)[:, :n]
+        all_scores = np.take_along_axis(all_scores, keep, axis=1)
+        all_columns = np.take_along_axis(all_columns, keep, axis=1)
+    return all_scores, all_columns
+
+
+def embedding_neighbors(
+    embeddings: np.ndarray,
+    inverse_norms: np.ndarray,
+    query_rows: np.ndarray,
+    n_neighbors: int,
+    valid: Optional[np.ndarray] = None,
+    row_block: int = ROW_BLOCK,
+    column_block: int = COLUMN_BLOCK
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top cosine neighbors of some embedding rows, in blocks
+
+    Args:
+        embeddings: (n, dim) matrix (may be a memory map)
+        inverse_norms: 1 / L2 norm of every row
+        query_rows: Rows to find neighbors for
+        n_neighbors: Neighbors per row
+        valid: Boolean mask of rows allowed as neighbors (default: all)
+        row_block, column_block: Block shape of the similarity matrix
+
+    Returns:
+        (neighbor rows, cosine scores), each (len(query_rows), n_neighbors),
+        best first; rows are -1 (score -inf) where fewer neighbors exist
+    """
+    n = len(embeddings)
+    neighbor_rows = np.full((len(query_rows), n_neighbors), -1, dtype=np.int64)
+    neighbor_scores = np.full((len(query_rows), n_neighbors), -np.inf, dtype=np.float32)
+
+    for row_start in range(0, len(query_rows), row_block):
+        rows = query_rows[row_start:row_start + row_block]
+        queries = np.asarray(embeddings[rows], dtype=np.float32) * inverse_norms[rows, None]
+        best_scores = np.full((len(rows), 0), -np.inf, dtype=np.float32)
+        best_columns = np.empty((len(rows), 0), dtype=np.int64)
+
+        for column_start in range(0, n, column_block):
+            column_end = min(column_start + column_block, n)
+            block = np.asarray(embeddings[column_start:column_end], dtype=np.float32)
+            scores = (queries @ block.T) * inverse_norms[column_start:column_end]
+            if valid is not None:
+                scores[:, ~valid[column_start:column_end]] = -np.inf
+            # A product is not its own neighbor
+            own = (rows >= column_start) & (rows < column_end)
+            scores[np.flatnonzero(own), rows[own] - column_start] = -np.inf
+
+            k = min(n_neighbors, scores.shape[1])
+            columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores, best_columns = _merge_top(
+                best_scores, best_columns,
+                np.take_along_axis(scores, columns, axis=1), columns + column_start,
+                n_neighbors
+            )
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_columns = np.take_along_axis(best_columns, order, axis=1)
+        best_columns[~np.isfinite(best_scores)] = -1
+        width = best_scores.shape[1]
+        neighbor_rows[row_start:row_start + len(rows), :width] = best_columns
+        neighbor_scores[row_start:row_start + len(rows), :width] = best_scores
+
+    return neighbor_rows, neighbor_scores
+
+
+def attribute_tokens(product: dict) -> List[str]:
+    """Categories, features and brand of a product as match tokens"""
+    tokens = [f"category:{category.lower()}" for category in product['categories']]
+    tokens += [f"feature:{feature.lower()}" for feature in product['features']]
+    tokens.append(f"brand:{product['brand'].lower()}")
+    return list(dict.fromkeys(tokens))
+
+
+class AttributeSimilarity:
+    """
+    Similarity from shared categories, features and brand.
+
+    Two products score the sum of the IDF weights of the tokens they share,
+    so sharing a niche category counts for more than sharing a broad one.
+    """
+
+    def __init__(self, products: Sequence[dict], max_postings: int = MAX_POSTINGS):
+        self.max_postings = max_postings
+        token_ids: Dict[str, int] = {}
+        product_tokens = []
+        token_products: List[List[int]] = []
+        for position, product in enumerate(products):
+            ids = []
+            for token in attribute_tokens(product):
+                token_id = token_ids.setdefault(token, len(token_ids))
+                if token_id == len(token_products):
+                    token_products.append([])
+                token_products[token_id].append(position)
+                ids.append(token_id)
+            product_tokens.append(ids)
+
+        self.n_products = len(product_tokens)
+        self.product_tokens = product_tokens
+        self.postings = [np.asarray(positions, dtype=np.int64) for positions in token_products]
+        self.weights = np.array(
+            [math.log(1 + self.n_products / len(positions)) for positions in token_products],
+            dtype=np.float32
+        )
+
+    def neighbors(self, position: int, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Most similar products of the product at a catalog position
+
+        Returns:
+            (positions, scores) of products sharing at least one token, best first
+        """
+        tokens = self.product_tokens[position]
+        selective = [token for token in tokens if len(self.postings[token]) <= self.max_postings]
+        tokens = selective or tokens
+        if not tokens:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        positions = np.concatenate([self.postings[token] for token in tokens])
+        weights = np.repeat(self.weights[tokens], [len(self.postings[token]) for token in tokens])
+        scores = np.bincount(positions, weights=weights, minlength=self.n_products)
+        scores[position] = 0.0
+        best = top_k(scores, n_neighbors)
+        best = best[scores[best] > 0]
+        return best, scores[best].astype(np.float32)
+
+
+class SimilarityTable:
+    """
+    Array-backed neighbor lists, looked up by binary search on product ID.
+    """
+
+    def __init__(self, product_ids: np.ndarray, neighbors: np.ndarray,
+                 scores: np.ndarray, sources: np.ndarray):
+        self.product_ids = product_ids
+        self.neighbors = neighbors
+        self.scores = scores
+        self.sources = sources
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @property
+    def n_neighbors(self) -> int:
+        return self.neighbors.shape[1]
+
+    def lookup(self, product_id: int) -> Optional[Tuple[List[int], List[float], str]]:
+        """(neighbor IDs, scores, source name) of a product, or None if it is not in the table"""
+        slot = int(np.searchsorted(self.product_ids, product_id))
+        if slot == len(self.product_ids) or self.product_ids[slot] != product_id:
+            return None
+        neighbors = self.neighbors[slot]
+        found = neighbors >= 0
+        return (neighbors[found].tolist(), self.scores[slot][found].tolist(),
+                SOURCE_NAMES[int(self.sources[slot])])
+
+    def save(self, path: str, **params):
+        """Write the table to a directory, replacing any previous table"""
+        def write(directory: str):
+            for name in ("product_ids", "neighbors", "scores", "sources"):
+                np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(directory, "params.json"), "w") as f:
+                json.dump({"n_products": len(self), "n_neighbors": self.n_neighbors, **params}, f, indent=2)
+
+        replace_directory(path, write)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityTable":
+        """Open a table directory (arrays are memory-mapped)"""
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        return cls(load("product_ids"), load("neighbors"), load("scores"), load("sources"))
+
+
+def build_similarity_table(
+    products: Sequence[dict],
+    store: Optional[EmbeddingStore] = None,
+    n_neighbors: int = DEFAULT_NEIGHBORS
+) -> SimilarityTable:
+    """
+    Compute the neighbor lists of every catalog product
+
+    Args:
+        products: Catalog products
+        store: Product embeddings (products without one use shared attributes)
+        n_neighbors: Neighbors kept per product
+    """
+    n = len(products)
+    ids = np.array([product['id'] for product in products], dtype=np.int64)
+    neighbors = np.full((n, n_neighbors), -1, dtype=np.int64)
+    scores = np.zeros((n, n_neighbors), dtype=np.float32)
+    sources = np.full(n, SOURCE_ATTRIBUTES, dtype=np.uint8)
+
+    embedded = np.zeros(n, dtype=bool)
+    if store is not None and len(store):
+        # Embedding rows of catalog products, and which rows may be neighbors
+        row_order = np.argsort(store.product_ids, kind="stable")
+        slots = np.searchsorted(store.product_ids, ids, sorter=row_order)
+        slots = np.minimum(slots, len(row_order) - 1)
+        rows = row_order[slots]
+        embedded = store.product_ids[rows] == ids
+        valid = np.zeros(len(store), dtype=bool)
+        valid[rows[embedded]] = True
+
+        positions = np.flatnonzero(embedded)
+        neighbor_rows, neighbor_scores = embedding_neighbors(
+            store.embeddings, store.inverse_norms, rows[positions], n_neighbors, valid
+        )
+        found = neighbor_rows >= 0
+        neighbors[positions] = np.where(found, store.product_ids[np.maximum(neighbor_rows, 0)], -1)
+        scores[positions] = np.where(found, neighbor_scores, 0.0)
+        sources[positions] = SOURCE_EMBEDDINGS
+
+    missing = np.flatnonzero(~embedded)
+    if len(missing):
+        similarity = AttributeSimilarity(products)
+        for position in missing.tolist():
+            found_positions, found_scores = similarity.neighbors(position, n_neighbors)
+            neighbors[position, :len(found_positions)] = ids[found_positions]
+            scores[position, :len(found_scores)] = found_scores
+
+    order = np.argsort(ids, kind="stable")
+    return SimilarityTable(ids[order], neighbors[order], scores[order], sources[order])
+
+
+def load_similarity_table(path: str = TABLE_DIR, models_dir: str = MODELS_DIR) -> Optional[SimilarityTable]:
+    """
+    The precomputed neighbor table, or None if it has not been built
+
+    A table built from embeddings that have changed since is ignored (None)
+    with a warning.
+    """
+    params = read_params(os.path.join(path, "params.json"))
+    if not params:
+        return None
+    if params.get("embeddings") and is_stale(params, embeddings_version(models_dir)):
+        warnings.warn(f"Ignoring {path}: it was built from different embeddings; rebuild it")
+        return None
+    return SimilarityTable.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS)
+    parser.add_argument("--output", default=TABLE_DIR)
+    args = parser.parse_args()
+
+    import products_data
+    from catalog_store import catalog_fingerprint
+    from embedding_store import load_embedding_store
+
+    products = products_data.get_all_products()
+    try:
+        store = load_embedding_store(quantization="", catalog=catalog_fingerprint(products))
+    except FileNotFoundError:
+        store = None
+        print("No embeddings found; using shared categories, features and brand only")
+
+    start = time.perf_counter()
+    table = build_similarity_table(products, store, args.neighbors)
+    table.save(args.output, embeddings=store is not None,
+               embeddings_version=embeddings_version() if store is not None else None)
+    print(f"Wrote {args.neighbors} neighbors for {len(table)} products to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
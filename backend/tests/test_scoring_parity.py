@@ -0,0 +1,45 @@
+"""
+The index and numpy scoring backends must score and rank exactly like
+calculate_relevance_score (the python backend) on the bundled catalog.
+"""
+
+import pytest
+
+import products_data
+from api import build_scorer
+
+CATALOG = products_data.get_catalog()
+PRODUCTS, NORMALIZED = CATALOG.products, CATALOG.normalized
+
+QUERIES = [
+    # substrings of words
+    "pho", "pro", "a", "5g", "ultra",
+    # multi-word, repeated and mixed-case words
+    "noise cancelling", "gaming laptop", "camera camera", "PRO MAX", "wireless charging case",
+    # categories and brands
+    "Smartphones", "laptops", "Premium", "Apple", "samsung", "sony",
+    # no match
+    "xyzzy",
+]
+
+
+def ranking(scores):
+    """Positions by score (descending), ties in catalog order"""
+    return sorted(scores, key=lambda position: (-scores[position], position))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return build_scorer("python", PRODUCTS, NORMALIZED)
+
+
+@pytest.mark.parametrize("backend", ["index", "numpy"])
+def test_backend_matches_reference(backend, reference):
+    scorer = build_scorer(backend, PRODUCTS, NORMALIZED)
+    for query in QUERIES:
+        expected = reference.search(query)
+        scores = scorer.search(query)
+        assert scores.keys() == expected.keys(), query
+        for position, score in expected.items():
+            assert scores[position] == pytest.approx(score), (query, position)
+        assert ranking(scores) == ranking(expected), query
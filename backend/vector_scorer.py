@@ -0,0 +1,183 @@
+"""
+SmartCart AI - Vectorized Relevance Scoring
+NumPy scoring backend that evaluates a query against the whole catalog at once
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from products_data import normalize_product
+
+# Field weights (kept in sync with calculate_relevance_score in api.py),
+# in the column order of the field hit matrix
+FIELD_WEIGHTS = np.array([
+    3.0,  # title (per matching query word)
+    2.0,  # description (per matching query word)
+    1.0,  # features (per matching feature and query word)
+    2.0,  # categories (per category containing the query)
+    1.0,  # brand (brand contains the query)
+    1.0,  # specifications (specifications contain the query)
+])
+
+
+class SparseTermMatrix:
+    """
+    Term-by-row incidence matrix stored column-major (CSC)
+
+    Column t lists the rows (products or features) containing term t,
+    so multiplying by a term indicator vector only touches matching terms.
+    """
+
+    def __init__(self, rows: List[int], terms: List[int], n_terms: int):
+        rows = np.asarray(rows, dtype=np.int64)
+        terms = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms, kind='stable')
+        self.row_indices = rows[order]
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=self.indptr[1:])
+
+    def rows_for(self, term_mask: np.ndarray) -> np.ndarray:
+        """Row indices for every (row, term) entry whose term is set in the mask"""
+        matched = np.flatnonzero(term_mask)
+        starts = self.indptr[matched]
+        lengths = self.indptr[matched + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatenate the matched columns without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.row_indices[offsets + np.arange(total)]
+
+
+class VectorScorer:
+    """
+    Catalog-wide relevance scoring with NumPy.
+
+    Each field is represented as a sparse term-by-product matrix. A query is
+    turned into term indicator vectors (substring matches against each field
+    vocabulary, exactly like calculate_relevance_score), multiplied through
+    the field matrices into a product-by-field hit matrix, and combined with
+    the field weights in a single matrix-vector product.
+    """
+
+    def __init__(self, products: List[dict], normalized: Optional[List[dict]] = None):
+        """
+        Args:
+            products: Catalog products
+            normalized: Precomputed normalized view of the same products
+                (see products_data.normalize_product), computed if omitted
+        """
+        self.products = products
+        if normalized is None:
+            normalized = [normalize_product(product) for product in self.products]
+        n_products = len(self.products)
+
+        tokens: Dict[str, int] = {}
+        categories: Dict[str, int] = {}
+        brands: Dict[str, int] = {}
+        specifications: Dict[str, int] = {}
+
+        title_rows, title_terms = [], []
+        description_rows, description_terms = [], []
+        feature_rows, feature_terms, feature_products = [], [], []
+        category_rows, category_terms = [], []
+        brand_terms, specification_terms = [], []
+
+        for position, product in enumerate(normalized):
+            for token in product['title_words']:
+                title_rows.append(position)
+                title_terms.append(tokens.setdefault(token, len(tokens)))
+
+            for token in product['description_words']:
+                description_rows.append(position)
+                description_terms.append(tokens.setdefault(token, len(tokens)))
+
+            for feature in product['features']:
+                feature_row = len(feature_products)
+                feature_products.append(position)
+                for token in set(feature.split()):
+                    feature_rows.append(feature_row)
+                    feature_terms.append(tokens.setdefault(token, len(tokens)))
+
+            for category in product['categories']:
+                category_rows.append(position)
+                category_terms.append(categories.setdefault(category, len(categories)))
+
+            brand_terms.append(brands.setdefault(product['brand'], len(brands)))
+            specification_terms.append(
+                specifications.setdefault(product['specifications'], len(specifications))
+            )
+
+        self._n_products = n_products
+        self._tokens = np.array(list(tokens), dtype=str)
+        self._categories = np.array(list(categories), dtype=str)
+        self._brands = np.array(list(brands), dtype=str)
+        self._specifications = np.array(list(specifications), dtype=str)
+
+        self._title = SparseTermMatrix(title_rows, title_terms, len(tokens))
+        self._description = SparseTermMatrix(description_rows, description_terms, len(tokens))
+        self._features = SparseTermMatrix(feature_rows, feature_terms, len(tokens))
+        self._feature_products = np.asarray(feature_products, dtype=np.int64)
+        self._category_matrix = SparseTermMatrix(category_rows, category_terms, len(categories))
+        self._brand_terms = np.asarray(brand_terms, dtype=np.int64)
+        self._specification_terms = np.asarray(specification_terms, dtype=np.int64)
+
+    @staticmethod
+    def _contains(vocabulary: np.ndarray, text: str) -> np.ndarray:
+        """Indicator over a vocabulary of entries containing text as a substring"""
+        if len(vocabulary) == 0:
+            return np.zeros(0, dtype=bool)
+        return np.char.find(vocabulary, text) >= 0
+
+    def score_all(self, query: str) -> np.ndarray:
+        """
+        Relevance score of every product for a query
+
+        Returns:
+            Array of scores in catalog order (identical to calculate_relevance_score)
+        """
+        n = self._n_products
+        if not query:
+            return np.full(n, 5.0)
+
+        query_lower = query.lower()
+        hits = np.zeros((n, len(FIELD_WEIGHTS)))
+
+        for word in query_lower.split():
+            token_mask = self._contains(self._tokens, word)
+            if not token_mask.any():
+                continue
+
+            title_hit = np.zeros(n, dtype=bool)
+            title_hit[self._title.rows_for(token_mask)] = True
+            hits[:, 0] += title_hit
+
+            description_hit = np.zeros(n, dtype=bool)
+            description_hit[self._description.rows_for(token_mask)] = True
+            hits[:, 1] += description_hit
+
+            feature_hit = np.zeros(len(self._feature_products), dtype=bool)
+            feature_hit[self._features.rows_for(token_mask)] = True
+            hits[:, 2] += np.bincount(
+                self._feature_products[feature_hit], minlength=n
+            )
+
+        category_mask = self._contains(self._categories, query_lower)
+        hits[:, 3] = np.bincount(self._category_matrix.rows_for(category_mask), minlength=n)
+        hits[:, 4] = self._contains(self._brands, query_lower)[self._brand_terms]
+        hits[:, 5] = self._contains(self._specifications, query_lower)[self._specification_terms]
+
+        return hits @ FIELD_WEIGHTS
+
+    def search(self, query: str) -> Dict[int, float]:
+        """
+        Score products for a query
+
+        Returns:
+            Mapping of catalog position -> relevance score, only for products
+            with a positive score
+        """
+        scores = self.score_all(query)
+        positions = np.flatnonzero(scores > 0)
+        return dict(zip(positions.tolist(), scores[positions].tolist()))
@@ -32,6 +32,28 @@ export const getRecommendations = async (params = {}) => {
   }
 };
 
+// Get a single product by ID
+export const getProduct = async (productId) => {
+  try {
+    const response = await api.get(`/api/products/${productId}`);
+    return response.data;
+  } catch (error) {
+    console.error('Failed to fetch product:', error);
+    throw error;
+  }
+};
+
+// Get several products by ID in one request
+export const getProductsByIds = async (ids) => {
+  try {
+    const response = await api.post('/api/products:batchGet', { ids });
+    return response.data;
+  } catch (error) {
+    console.error('Failed to fetch products:', error);
+    throw error;
+  }
+};
+
 // Get analytics data
 export const getAnalytics = async () => {
   try {
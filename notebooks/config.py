@@ -59,6 +59,9 @@ MIN_TEXT_LENGTH = 10   # Minimum characters for valid text
 # Image preprocessing
 IMAGE_TIMEOUT = 5      # Timeout for image downloads (seconds)
 IMAGE_SIZE = (224, 224)  # Image resize dimensions
+MAX_CONCURRENT_DOWNLOADS = 32  # Image requests in flight at once
+IMAGES_PER_PRODUCT = 1  # Images fetched per product (features are averaged)
+IMAGE_CACHE_DIR = './image_cache'  # Decoded, resized images (content-addressed)
 
 # Missing value handling
 FILL_MISSING_BRAND = 'Generic'
@@ -0,0 +1,303 @@
+"""
+SmartCart AI - Embedding Fusion
+
+Chunked text + image embedding fusion with ALPHA/BETA weights, driven by config.py.
+
+Text embeddings (text_embeddings.npy, rows identified by embedding_ids.npy)
+and image features (image_features.npy, one row per product) are streamed in
+matching chunks; neither matrix is loaded whole. Both are L2-normalized, the
+image features are brought to the text dimension (a fixed random orthonormal
+projection) or both are zero-padded to the larger one, and the weighted sum
+
+    combined = (ALPHA * text + BETA * image) / ||ALPHA * text + BETA * image||
+
+is written to a memory-mapped combined_embeddings.npy, row-aligned with
+text_embeddings.npy so embedding_ids.npy applies to both. combined_embeddings.json
+records the weights and the version of the text embeddings it was fused
+from; load_combined() (and the backend) refuse it once they have changed.
+
+Sources are read and projected once, in prepare(); the per-row text/image
+cosine is kept so any ALPHA/BETA pair is then normalized without revisiting
+the sources, which makes weight sweeps cheap.
+
+Usage (from notebooks/):
+    python embedding_fusion.py [--alpha A] [--beta B] [--mode project|pad] [--sweep 0.5,0.7,0.9]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from embedding_pipeline import embeddings_version, params_path, read_params, write_params
+
+TEXT_EMBEDDINGS_FILE = 'text_embeddings.npy'
+IDS_FILE = 'embedding_ids.npy'
+IMAGE_FEATURES_FILE = 'image_features.npy'
+COMBINED_EMBEDDINGS_FILE = 'combined_embeddings.npy'
+
+FUSION_MODES = ('project', 'pad')
+
+# Rows fused at a time (bounded by the width of the image features)
+FUSION_CHUNK_ROWS = 16384
+
+
+def random_projection(input_dim: int, output_dim: int, seed: int = config.RANDOM_SEED) -> np.ndarray:
+    """(input_dim, output_dim) matrix with orthonormal columns, from a seeded Gaussian"""
+    rng = np.random.default_rng(seed)
+    gaussian = rng.standard_normal((input_dim, output_dim))
+    if input_dim < output_dim:
+        return np.linalg.qr(gaussian.T)[0].T.astype(np.float32)
+    return np.linalg.qr(gaussian)[0].astype(np.float32)
+
+
+def _unit_rows(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows scaled to unit length, and which rows were non-zero"""
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    present = norms[:, 0] > 0
+    norms[~present] = 1.0
+    return block / norms, present
+
+
+def _pad(block: np.ndarray, dim: int) -> np.ndarray:
+    if block.shape[1] == dim:
+        return block
+    padded = np.zeros((len(block), dim), dtype=np.float32)
+    padded[:, :block.shape[1]] = block
+    return padded
+
+
+class EmbeddingFusion:
+    """
+    Weighted text + image fusion over memory-mapped sources.
+
+    prepare() reads both sources once, chunk by chunk, and keeps the unit
+    image rows already in the output dimension (in a temporary file), the
+    text inverse norms, and per row the text/image cosine and which of the
+    two exist. combine() then only streams unit text and prepared image
+    rows for each ALPHA/BETA pair.
+
+    Use as a context manager (or call close()) to remove the temporary file.
+    """
+
+    def __init__(self, text: np.ndarray, text_ids: np.ndarray, image: np.ndarray,
+                 mode: str = 'project', projection: Optional[np.ndarray] = None,
+                 chunk_rows: int = FUSION_CHUNK_ROWS, work_dir: Optional[str] = None,
+                 text_version: Optional[str] = None):
+        """
+        Args:
+            text: (n, text_dim) text embeddings (may be a memory map)
+            text_ids: Product ID of every text row (-1 for unused rows)
+            image: (products, image_dim) image features, row i for product ID i + 1
+            mode: "project" (image features to the text dimension) or
+                "pad" (zero-pad both to the larger dimension)
+            projection: (image_dim, text_dim) matrix for "project"
+                (default: random_projection)
+            chunk_rows: Rows per chunk
+            work_dir: Directory for the prepared image rows (default: system temp)
+            text_version: Content version of the text embeddings (see
+                embedding_pipeline.embeddings_version), recorded with the output
+        """
+        if mode not in FUSION_MODES:
+            raise ValueError(f"mode must be one of {', '.join(FUSION_MODES)}")
+        if len(text_ids) != len(text):
+            raise ValueError(f'{len(text_ids)} IDs for {len(text)} text embeddings')
+        self.text = text
+        self.text_ids = np.asarray(text_ids, dtype=np.int64)
+        self.image = image
+        self.mode = mode
+        self.chunk_rows = chunk_rows
+        text_dim, image_dim = text.shape[1], image.shape[1]
+        if mode == 'project':
+            self.dim = text_dim
+            if projection is None and image_dim != text_dim:
+                projection = random_projection(image_dim, text_dim)
+            if projection is not None and projection.shape != (image_dim, text_dim):
+                raise ValueError(f'projection must be {(image_dim, text_dim)}, not {projection.shape}')
+        else:
+            self.dim = max(text_dim, image_dim)
+        self.projection = projection
+        self.text_version = text_version
+        self._work_dir = tempfile.mkdtemp(prefix='fusion-', dir=work_dir)
+        self._prepared = False
+
+    def __enter__(self) -> 'EmbeddingFusion':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.unit_image = None
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def _image_rows(self, ids: np.ndarray) -> np.ndarray:
+        """Image features of product IDs, zero rows where there are none"""
+        rows = ids - 1
+        valid = (rows >= 0) & (rows < len(self.image))
+        block = np.zeros((len(ids), self.image.shape[1]), dtype=np.float32)
+        if valid.any():
+            block[valid] = self.image[rows[valid]]
+        return block
+
+    def prepare(self):
+        """Read, normalize and project the sources once"""
+        if self._prepared:
+            return
+        n = len(self.text)
+        self.text_inverse_norms = np.zeros(n, dtype=np.float32)
+        self.has_text = np.zeros(n, dtype=bool)
+        self.has_image = np.zeros(n, dtype=bool)
+        self.cosines = np.zeros(n, dtype=np.float32)
+        self.unit_image = np.lib.format.open_memmap(
+            os.path.join(self._work_dir, 'unit_image.npy'), mode='w+',
+            dtype=np.float32, shape=(n, self.dim)
+        )
+
+        for start in range(0, n, self.chunk_rows):
+            end = min(start + self.chunk_rows, n)
+            text = np.asarray(self.text[start:end], dtype=np.float32)
+            norms = np.linalg.norm(text, axis=1)
+            self.has_text[start:end] = norms > 0
+            self.text_inverse_norms[start:end] = np.where(norms > 0, 1.0 / np.maximum(norms, 1e-30), 0.0)
+
+            image = self._image_rows(self.text_ids[start:end])
+            image, _ = _unit_rows(image)
+            if self.projection is not None:
+                image = image @ self.projection
+            image, present = _unit_rows(_pad(image, self.dim))
+            self.has_image[start:end] = present
+            self.unit_image[start:end] = image
+
+            unit_text = _pad(text * self.text_inverse_norms[start:end, None], self.dim)
+            self.cosines[start:end] = np.einsum('ij,ij->i', unit_text, image)
+        self.unit_image.flush()
+        self._prepared = True
+
+    def row_scales(self, alpha: float, beta: float) -> np.ndarray:
+        """
+        1 / ||alpha * text + beta * image|| per row, from the kept cosines
+
+        Rows with neither text nor image get 0.
+        """
+        self.prepare()
+        squared = (alpha * alpha * self.has_text + beta * beta * self.has_image
+                   + 2 * alpha * beta * self.cosines)
+        squared = np.maximum(squared, 0.0)
+        return np.where(squared > 0, 1.0 / np.sqrt(np.maximum(squared, 1e-30)), 0.0).astype(np.float32)
+
+    def combine(self, alpha: float = config.ALPHA, beta: float = config.BETA,
+                output_path: Optional[str] = None) -> np.ndarray:
+        """
+        Write the fused, L2-normalized embeddings for one weighting
+
+        Args:
+            alpha: Text weight
+            beta: Image weight
+            output_path: .npy file to write (memory-mapped), with its
+                parameters in a .json file next to it; default: a file in
+                the temporary directory, replaced by the next combine() and
+                removed by close()
+
+        Returns:
+            The combined matrix, memory-mapped read-only
+        """
+        if alpha < 0 or beta < 0 or alpha + beta == 0:
+            raise ValueError('alpha and beta must be non-negative and not both zero')
+        scales = self.row_scales(alpha, beta)
+        if output_path is None:
+            output_path = os.path.join(self._work_dir, 'combined.npy')
+        output = np.lib.format.open_memmap(output_path + '.tmp', mode='w+', dtype=np.float32,
+                                           shape=(len(self.text), self.dim))
+        for start in range(0, len(self.text), self.chunk_rows):
+            end = min(start + self.chunk_rows, len(self.text))
+            text = np.asarray(self.text[start:end], dtype=np.float32)
+            text = _pad(text * (alpha * self.text_inverse_norms[start:end, None]), self.dim)
+            combined = text + beta * self.unit_image[start:end]
+            output[start:end] = combined * scales[start:end, None]
+        output.flush()
+        del output
+        os.replace(output_path + '.tmp', output_path)
+        write_params(params_path(output_path), self.params(alpha, beta))
+        return np.load(output_path, mmap_mode='r')
+
+    def params(self, alpha: float, beta: float) -> dict:
+        """
+        Parameters recorded with a combined matrix
+
+        Its version identifies the text embeddings and weighting it was
+        fused from (None when the text embeddings have no version).
+        """
+        version = None
+        if self.text_version is not None:
+            version = hashlib.blake2b(
+                json.dumps([self.text_version, self.mode, alpha, beta]).encode('utf-8'),
+                digest_size=16
+            ).hexdigest()
+        return {'version': version, 'embeddings_version': self.text_version,
+                'alpha': alpha, 'beta': beta, 'mode': self.mode}
+
+    def sweep(self, weights: Iterable[Tuple[float, float]]) -> Iterable[Tuple[float, float, np.ndarray]]:
+        """Yield (alpha, beta, combined) per weighting, reusing the prepared sources"""
+        for alpha, beta in weights:
+            yield alpha, beta, self.combine(alpha, beta)
+
+
+def load_fusion(models_dir: str = config.MODELS_DIR, mode: str = 'project',
+                **kwargs) -> EmbeddingFusion:
+    """EmbeddingFusion over the text embeddings and image features in a models directory"""
+    text = np.load(os.path.join(models_dir, TEXT_EMBEDDINGS_FILE), mmap_mode='r')
+    ids_path = os.path.join(models_dir, IDS_FILE)
+    ids = np.load(ids_path) if os.path.exists(ids_path) else np.arange(1, len(text) + 1)
+    image = np.load(os.path.join(models_dir, IMAGE_FEATURES_FILE), mmap_mode='r')
+    kwargs.setdefault('text_version', embeddings_version(models_dir))
+    return EmbeddingFusion(text, ids, image, mode, **kwargs)
+
+
+def load_combined(models_dir: str = config.MODELS_DIR,
+                  filename: str = COMBINED_EMBEDDINGS_FILE) -> np.ndarray:
+    """
+    Open a combined matrix as a memory map
+
+    Raises:
+        ValueError: If the text embeddings changed since it was fused
+            (re-run embedding_fusion.py)
+    """
+    path = os.path.join(models_dir, filename)
+    params = read_params(params_path(path))
+    current = embeddings_version(models_dir)
+    if current is not None and params.get('embeddings_version') != current:
+        raise ValueError(f'{filename} was fused from other text embeddings; re-run embedding_fusion.py')
+    return np.load(path, mmap_mode='r')
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Fuse text embeddings and image features')
+    parser.add_argument('--models-dir', default=config.MODELS_DIR)
+    parser.add_argument('--alpha', type=float, default=config.ALPHA, help='text weight')
+    parser.add_argument('--beta', type=float, default=config.BETA, help='image weight')
+    parser.add_argument('--mode', choices=FUSION_MODES, default='project')
+    parser.add_argument('--sweep', default=None,
+                        help='comma-separated ALPHA values (BETA = 1 - ALPHA); writes one file each')
+    args = parser.parse_args(argv)
+
+    with load_fusion(args.models_dir, args.mode, work_dir=args.models_dir) as fusion:
+        if args.sweep:
+            for alpha in (float(value) for value in args.sweep.split(',')):
+                path = os.path.join(args.models_dir, f'combined_embeddings.alpha{alpha:.2f}.npy')
+                fusion.combine(alpha, 1.0 - alpha, path)
+                print(f'ALPHA={alpha:.2f} BETA={1.0 - alpha:.2f} -> {path}')
+        else:
+            path = os.path.join(args.models_dir, COMBINED_EMBEDDINGS_FILE)
+            combined = fusion.combine(args.alpha, args.beta, path)
+            print(f'Wrote {combined.shape[0]} x {combined.shape[1]} combined embeddings to {path}')
+
+
+if __name__ == '__main__':
+    main()
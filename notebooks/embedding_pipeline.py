@@ -0,0 +1,689 @@
+"""
+SmartCart AI - Embedding Pipeline
+
+Command-line text embedding extraction for large catalogs, driven by config.py.
+
+The CSV is read in chunks of CHECKPOINT_FREQUENCY products. Each chunk is
+encoded in TEXT_BATCH_SIZE batches across NUM_WORKERS CPU processes and,
+with SAVE_CHECKPOINTS, written as a shard to MODELS_DIR/text_embedding_shards/.
+An interrupted run resumes after the last complete shard. Finally the shards
+are merged into text_embeddings.npy and embedding_ids.npy, the files the
+backend serves (IDs are CSV row numbers starting at 1, like the backend's
+CSV loader).
+
+Each run also records a content hash of every product's text fields and the
+model name in embedding_hashes.npz. Later runs with the same model only
+re-encode new and changed products: changed products keep their rows, new
+products take the rows of removed ones and the rest are appended. The
+matrix is rewritten to a new file that is renamed into place, so a server
+reading the old one is never affected.
+
+embedding_hashes.npz also holds a version of the embeddings' content, and
+a fingerprint of the CSV rows (ID and uniq_id) they were computed for, which
+the backend checks against the catalog it serves.
+Files built from them (ANN index, quantized copies, similar-product table,
+fused embeddings) record the version they were built from, and are
+ignored or refused once it no longer matches.
+
+Usage (from notebooks/):
+    python embedding_pipeline.py [--data PATH] [--workers N] [--batch-size N] [--restart] [--full]
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+SHARDS_DIR = os.path.join(config.MODELS_DIR, 'text_embedding_shards')
+EMBEDDINGS_FILE = 'text_embeddings.npy'
+IDS_FILE = 'embedding_ids.npy'
+HASHES_FILE = 'embedding_hashes.npz'
+
+# Rows copied at a time when a matrix has to be rewritten
+COPY_CHUNK_ROWS = 65536
+
+# CSV columns the product text is built from (categories is optional)
+TEXT_COLUMNS = ['uniq_id', 'title', 'description', 'brand', 'categories']
+
+
+def parse_list(value: str) -> List[str]:
+    """Parse a stringified list column of the CSV export (categories, images)"""
+    if not value:
+        return []
+    try:
+        items = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return [value.strip()]
+    if isinstance(items, str):
+        items = [items]
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def product_text(title: str, description: str, brand: str, categories: str) -> str:
+    """
+    Text encoded for a product: title, brand, categories and description
+
+    Truncated to MAX_TEXT_LENGTH characters.
+    """
+    parts = [
+        title.strip(),
+        brand.strip() or config.FILL_MISSING_BRAND,
+        ', '.join(parse_list(categories)),
+        description.strip(),
+    ]
+    return '. '.join(part for part in parts if part)[:config.MAX_TEXT_LENGTH]
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read the text columns of the CSV in chunks of chunk_size products"""
+    return pd.read_csv(
+        path,
+        usecols=lambda column: column in TEXT_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+    )
+
+
+def chunk_texts(chunk: pd.DataFrame) -> List[str]:
+    """Product texts of a CSV chunk"""
+    categories = chunk['categories'] if 'categories' in chunk else [''] * len(chunk)
+    return [
+        product_text(title, description, brand, category_list)
+        for title, description, brand, category_list in zip(
+            chunk['title'], chunk['description'], chunk['brand'], categories
+        )
+    ]
+
+
+def content_hash(title: str, description: str, brand: str, categories: str) -> str:
+    """Hex digest of the text fields a product's embedding is computed from"""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in (title, description, brand, categories):
+        digest.update(field.strip().encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def chunk_hashes(chunk: pd.DataFrame) -> List[str]:
+    """Content hashes of a CSV chunk"""
+    categories = chunk['categories'] if 'categories' in chunk else [''] * len(chunk)
+    return [
+        content_hash(title, description, brand, category_list)
+        for title, description, brand, category_list in zip(
+            chunk['title'], chunk['description'], chunk['brand'], categories
+        )
+    ]
+
+
+def catalog_digest():
+    """
+    Running fingerprint of the CSV rows, fed with update_catalog_digest
+
+    The same digest as the backend's catalog_store.catalog_fingerprint of a
+    catalog loaded from the CSV.
+    """
+    return hashlib.blake2b(digest_size=16)
+
+
+def update_catalog_digest(digest, ids: Iterable[int], chunk: pd.DataFrame):
+    """Add the (ID, uniq_id) pairs of a CSV chunk to a catalog fingerprint"""
+    for product_id, uniq_id in zip(ids, chunk['uniq_id']):
+        digest.update(f'{product_id}\t{uniq_id.strip()}\n'.encode('utf-8'))
+
+
+def chunk_keys(chunk: pd.DataFrame, seen: Dict[str, int]) -> List[str]:
+    """
+    Key of every product of a CSV chunk: its uniq_id
+
+    A uniq_id seen before (counted in `seen` across chunks) gets an
+    occurrence suffix, so every CSV row has its own key.
+    """
+    keys = []
+    for uniq_id in chunk['uniq_id']:
+        count = seen.get(uniq_id, 0)
+        seen[uniq_id] = count + 1
+        keys.append(uniq_id if count == 0 else f'{uniq_id}#{count}')
+    return keys
+
+
+# ----------------------------------------------------------------------------
+# Encoding (runs in worker processes)
+# ----------------------------------------------------------------------------
+
+_model = None
+
+
+def _load_model(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device='cpu')
+
+
+def _init_worker(model_name: str, threads: int):
+    """Load the model once per worker process, splitting the CPU cores between workers"""
+    global _model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _model = _load_model(model_name)
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return np.asarray(_model.encode(texts, batch_size=len(texts), show_progress_bar=False),
+                      dtype=np.float32)
+
+
+class TextEncoderPool:
+    """
+    Sentence-Transformers encoding across a pool of CPU processes.
+
+    Every worker holds its own copy of the model; batches of one chunk are
+    spread over the workers and come back in order.
+    """
+
+    def __init__(self, model_name: str = config.TEXT_MODEL_NAME,
+                 workers: int = config.NUM_WORKERS,
+                 batch_size: int = config.TEXT_BATCH_SIZE):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self._pool = None
+
+    def __enter__(self) -> 'TextEncoderPool':
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, threads),
+            )
+        else:
+            _init_worker(self.model_name, threads)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in batches of batch_size, in order"""
+        batches = [texts[start:start + self.batch_size]
+                   for start in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        if self._pool is None:
+            return np.vstack([_encode(batch) for batch in batches])
+        return np.vstack(list(self._pool.map(_encode, batches)))
+
+
+# ----------------------------------------------------------------------------
+# Shards
+# ----------------------------------------------------------------------------
+
+class ShardStore:
+    """
+    Numbered embedding shards in a directory, one per CSV chunk.
+
+    Shards are written to a temporary file and renamed, so a shard file
+    exists only once it is complete. A manifest records the settings the
+    shards were made with; resuming with different settings is refused.
+    """
+
+    def __init__(self, directory: str = SHARDS_DIR):
+        self.directory = directory
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, f'shard_{index:05d}.npz')
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, 'manifest.json')
+
+    def open(self, settings: dict, restart: bool = False) -> int:
+        """
+        Prepare the directory for a run
+
+        Returns:
+            Number of complete shards that can be reused
+
+        Raises:
+            ValueError: If existing shards were made with other settings
+        """
+        if restart:
+            self.clear()
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                existing = json.load(f)
+            if existing != settings:
+                raise ValueError(
+                    f'Shards in {self.directory} were made with {existing}; '
+                    f'rerun with --restart to discard them'
+                )
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._manifest_path, 'w') as f:
+                json.dump(settings, f, indent=2)
+        return self.completed()
+
+    def completed(self) -> int:
+        """Number of consecutive complete shards from the start"""
+        count = 0
+        while os.path.exists(self._path(count)):
+            count += 1
+        return count
+
+    def write(self, index: int, embeddings: np.ndarray, ids: np.ndarray,
+              keys: List[str], hashes: List[str]):
+        path = self._path(index)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, embeddings=embeddings, ids=ids, keys=np.array(keys, dtype=str),
+                     hashes=np.array(hashes, dtype=str))
+        os.replace(path + '.tmp', path)
+
+    def read(self, index: int) -> Tuple[np.ndarray, np.ndarray, List[str], List[str]]:
+        """(embeddings, ids, keys, hashes) of a shard"""
+        with np.load(self._path(index)) as shard:
+            return (shard['embeddings'], shard['ids'],
+                    shard['keys'].tolist(), shard['hashes'].tolist())
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def replace_atomically(path: str, write):
+    """Write a file through a temporary file and rename it into place"""
+    with open(path + '.tmp', 'wb') as f:
+        write(f)
+    os.replace(path + '.tmp', path)
+
+
+def write_ids(ids: np.ndarray, models_dir: str):
+    """Write the product ID of every embedding row (-1 for unused rows)"""
+    replace_atomically(os.path.join(models_dir, IDS_FILE), lambda f: np.save(f, ids))
+
+
+def write_embeddings(parts: Iterable[Tuple[np.ndarray, np.ndarray]], rows: int, dim: int,
+                     models_dir: str) -> int:
+    """
+    Write (embeddings, ids) parts, in order, as the backend's embedding files
+
+    Parts are streamed into a memory-mapped file, which is then renamed into
+    place, so only one part is in memory at a time.
+
+    Returns:
+        Number of rows written
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    embeddings_path = os.path.join(models_dir, EMBEDDINGS_FILE)
+    output = np.lib.format.open_memmap(embeddings_path + '.tmp', mode='w+',
+                                       dtype=np.float32, shape=(rows, dim))
+    all_ids = np.empty(rows, dtype=np.int64)
+    start = 0
+    for embeddings, ids in parts:
+        output[start:start + len(ids)] = embeddings
+        all_ids[start:start + len(ids)] = ids
+        start += len(ids)
+    output.flush()
+    del output
+
+    os.replace(embeddings_path + '.tmp', embeddings_path)
+    write_ids(all_ids, models_dir)
+    return rows
+
+
+def rewrite_rows(path: str, rows: np.ndarray, vectors: np.ndarray, n_rows: int):
+    """
+    Replace a 2-D .npy file by a copy with some rows set
+
+    The copy is written next to the file and renamed into place, so
+    processes that have the old file mapped keep reading it unchanged.
+
+    Args:
+        path: .npy file
+        rows: Rows to set; rows past the end of the file extend it
+        vectors: New value of each row
+        n_rows: Rows of the new file (every added row must be set)
+    """
+    existing = np.load(path, mmap_mode='r')
+    output = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=existing.dtype,
+                                       shape=(n_rows, existing.shape[1]))
+    kept = min(len(existing), n_rows)
+    for start in range(0, kept, COPY_CHUNK_ROWS):
+        end = min(start + COPY_CHUNK_ROWS, kept)
+        output[start:end] = existing[start:end]
+    if len(rows):
+        output[rows] = vectors
+    output.flush()
+    del output, existing
+    os.replace(path + '.tmp', path)
+
+
+def params_path(path: str) -> str:
+    """JSON parameters file recorded next to a .npy file"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def read_params(path: str) -> dict:
+    """Parameters from a JSON file, or {} if there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_params(path: str, params: dict):
+    replace_atomically(path, lambda f: f.write(json.dumps(params, indent=2).encode('utf-8')))
+
+
+def embeddings_version(models_dir: str, filename: str = EMBEDDINGS_FILE) -> Optional[str]:
+    """
+    Content version of an embeddings file, or None if it has none
+
+    The version of text_embeddings.npy is kept in embedding_hashes.npz;
+    files derived from it (embedding_fusion.py) keep theirs in a JSON file
+    next to them (see params_path).
+    """
+    version = read_params(params_path(os.path.join(models_dir, filename))).get('version')
+    if version is not None or filename != EMBEDDINGS_FILE:
+        return version
+    path = os.path.join(models_dir, HASHES_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return str(saved['version']) if 'version' in saved.files else None
+
+
+class EmbeddingIndex:
+    """
+    Content hash and matrix row of every embedded product, by key (uniq_id),
+    plus the model the embeddings were made with and the fingerprint of the
+    CSV rows they were computed for (see catalog_digest).
+
+    The version saved with the index is a hash of all of these, so it
+    changes whenever any embedding row does.
+    """
+
+    def __init__(self, model_name: str, keys: List[str], hashes: List[str], rows: List[int],
+                 catalog: Optional[str] = None):
+        self.model_name = model_name
+        self.catalog = catalog
+        self.hashes = dict(zip(keys, hashes))
+        self.rows = dict(zip(keys, rows))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def version(self) -> str:
+        """Content version of the embeddings described by the index"""
+        digest = hashlib.blake2b(self.model_name.encode('utf-8'), digest_size=16)
+        for key, row in self.rows.items():
+            digest.update(f'\n{key}\t{self.hashes[key]}\t{row}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, models_dir: str) -> Optional['EmbeddingIndex']:
+        """The index saved with the embeddings, or None if there is none"""
+        path = os.path.join(models_dir, HASHES_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as saved:
+            return cls(str(saved['model_name']), saved['keys'].tolist(),
+                       saved['hashes'].tolist(), saved['rows'].tolist(),
+                       str(saved['catalog']) if 'catalog' in saved.files else None)
+
+    def save(self, models_dir: str):
+        keys = list(self.rows)
+        extra = {} if self.catalog is None else {'catalog': np.array(self.catalog)}
+        replace_atomically(os.path.join(models_dir, HASHES_FILE), lambda f: np.savez(
+            f,
+            model_name=np.array(self.model_name),
+            version=np.array(self.version()),
+            keys=np.array(keys, dtype=str),
+            hashes=np.array([self.hashes[key] for key in keys], dtype=str),
+            rows=np.array([self.rows[key] for key in keys], dtype=np.int64),
+            **extra
+        ))
+
+
+def refresh_embeddings(
+    data_path: str,
+    models_dir: str,
+    index: EmbeddingIndex,
+    encoder: TextEncoderPool,
+    chunk_size: int,
+    verbose: bool = False
+) -> Dict[str, int]:
+    """
+    Re-encode only new and changed products and rewrite the embeddings
+
+    Changed products keep their rows. New products are encoded as they are
+    found and placed once the whole CSV has been read: first in rows left
+    by removed products, then appended to the matrix. Only re-encoded
+    vectors are held in memory; the matrix is copied with them set and
+    renamed into place (see rewrite_rows).
+
+    Returns:
+        Counts of unchanged, changed, new and removed products
+    """
+    embeddings_path = os.path.join(models_dir, EMBEDDINGS_FILE)
+    n_rows, dim = np.load(embeddings_path, mmap_mode='r').shape
+
+    keys, hashes, rows, ids = [], [], [], []
+    updated_rows, updated_vectors = [], []
+    new_vectors = []
+    counts = {'unchanged': 0, 'changed': 0, 'new': 0, 'removed': 0}
+    seen = {}
+    catalog = catalog_digest()
+    next_id = 1
+    for chunk in read_chunks(data_path, chunk_size):
+        chunk_ids = range(next_id, next_id + len(chunk))
+        next_id += len(chunk)
+        update_catalog_digest(catalog, chunk_ids, chunk)
+        pending = []
+        for position, (key, content, product_id) in enumerate(
+            zip(chunk_keys(chunk, seen), chunk_hashes(chunk), chunk_ids)
+        ):
+            keys.append(key)
+            hashes.append(content)
+            ids.append(product_id)
+            row = index.rows.get(key)
+            if row is not None and row >= n_rows:
+                row = None
+            rows.append(row)
+            if row is None or index.hashes[key] != content:
+                pending.append(position)
+            else:
+                counts['unchanged'] += 1
+        if not pending:
+            continue
+
+        vectors = encoder.encode(chunk_texts(chunk.iloc[pending]))
+        if vectors.shape[1] != dim:
+            raise ValueError(f'{index.model_name} produced {vectors.shape[1]} dimensions, '
+                             f'{EMBEDDINGS_FILE} has {dim}')
+        first = len(keys) - len(chunk)
+        for position, vector in zip(pending, vectors):
+            row = rows[first + position]
+            if row is None:
+                new_vectors.append((first + position, vector))
+                counts['new'] += 1
+            else:
+                updated_rows.append(row)
+                updated_vectors.append(vector)
+                counts['changed'] += 1
+        if verbose:
+            print(f'Chunk ending at product {next_id - 1}: {len(pending)} re-encoded')
+
+    # Rows not kept by any current product are free for new ones
+    free = np.ones(n_rows, dtype=bool)
+    free[[row for row in rows if row is not None]] = False
+    free_rows = np.flatnonzero(free).tolist()
+    counts['removed'] = len(index) - (len(rows) - counts['new'])
+    for (product, vector), row in zip(new_vectors, free_rows):
+        rows[product] = row
+        updated_rows.append(row)
+        updated_vectors.append(vector)
+    appended = new_vectors[len(free_rows):]
+    for offset, (product, vector) in enumerate(appended):
+        rows[product] = n_rows + offset
+        updated_rows.append(n_rows + offset)
+        updated_vectors.append(vector)
+    if updated_rows:
+        rewrite_rows(embeddings_path, np.array(updated_rows, dtype=np.int64),
+                     np.vstack(updated_vectors), n_rows + len(appended))
+
+    row_ids = np.full(n_rows + len(appended), -1, dtype=np.int64)
+    row_ids[rows] = ids
+    write_ids(row_ids, models_dir)
+    EmbeddingIndex(index.model_name, keys, hashes, rows, catalog.hexdigest()).save(models_dir)
+    return counts
+
+
+def run_pipeline(
+    data_path: str = config.DATA_PATH,
+    models_dir: str = config.MODELS_DIR,
+    model_name: str = config.TEXT_MODEL_NAME,
+    workers: int = config.NUM_WORKERS,
+    batch_size: int = config.TEXT_BATCH_SIZE,
+    chunk_size: int = config.CHECKPOINT_FREQUENCY,
+    save_checkpoints: bool = config.SAVE_CHECKPOINTS,
+    restart: bool = False,
+    keep_shards: bool = False,
+    incremental: bool = True,
+    verbose: bool = config.VERBOSE
+) -> int:
+    """
+    Embed every product of the CSV and write the backend's embedding files
+
+    Args:
+        data_path: Product CSV export
+        models_dir: Output directory (shards go to a subdirectory)
+        model_name: Sentence-Transformers model
+        workers: Encoding processes
+        batch_size: Texts per encoding batch
+        chunk_size: Products per CSV chunk and shard
+        save_checkpoints: Write shards and resume from them
+        restart: Discard existing shards
+        keep_shards: Keep the shards after merging
+        incremental: Re-encode only new and changed products when the
+            existing embeddings were made with the same model
+        verbose: Print progress per chunk
+
+    Returns:
+        Number of products encoded
+    """
+    index = EmbeddingIndex.load(models_dir) if incremental else None
+    if index is not None and index.model_name == model_name and \
+            os.path.exists(os.path.join(models_dir, EMBEDDINGS_FILE)):
+        with TextEncoderPool(model_name, workers, batch_size) as encoder:
+            counts = refresh_embeddings(data_path, models_dir, index, encoder, chunk_size, verbose)
+        if verbose:
+            print('Updated embeddings: ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+        return counts['changed'] + counts['new']
+
+    shards = ShardStore(os.path.join(models_dir, os.path.basename(SHARDS_DIR)))
+    settings = {
+        'data_path': os.path.abspath(data_path),
+        'model_name': model_name,
+        'chunk_size': chunk_size,
+    }
+    done = shards.open(settings, restart) if save_checkpoints else 0
+    if verbose and done:
+        print(f'Resuming after {done} complete shards ({done * chunk_size} products)')
+
+    in_memory = []
+    keys, hashes = [], []
+    seen = {}
+    catalog = catalog_digest()
+    next_id = 1
+    start_time = time.perf_counter()
+    encoded = 0
+    with TextEncoderPool(model_name, workers, batch_size) as encoder:
+        for index, chunk in enumerate(read_chunks(data_path, chunk_size)):
+            ids = np.arange(next_id, next_id + len(chunk), dtype=np.int64)
+            next_id += len(chunk)
+            chunk_key_list = chunk_keys(chunk, seen)
+            update_catalog_digest(catalog, ids.tolist(), chunk)
+            if index < done:
+                continue
+
+            embeddings = encoder.encode(chunk_texts(chunk))
+            chunk_hash_list = chunk_hashes(chunk)
+            if save_checkpoints:
+                shards.write(index, embeddings, ids, chunk_key_list, chunk_hash_list)
+            else:
+                in_memory.append((embeddings, ids))
+                keys += chunk_key_list
+                hashes += chunk_hash_list
+
+            encoded += len(chunk)
+            if verbose:
+                rate = encoded / max(time.perf_counter() - start_time, 1e-9)
+                print(f'Chunk {index + 1}: {next_id - 1} products ({rate:.0f} products/s)')
+
+    if save_checkpoints:
+        n_shards = shards.completed()
+        dim = shards.read(0)[0].shape[1] if n_shards else 0
+        for shard in range(n_shards):
+            _, _, shard_keys, shard_hashes = shards.read(shard)
+            keys += shard_keys
+            hashes += shard_hashes
+        parts = (shards.read(shard)[:2] for shard in range(n_shards))
+        rows = write_embeddings(parts, len(keys), dim, models_dir)
+        if not keep_shards:
+            shards.clear()
+    else:
+        dim = in_memory[0][0].shape[1] if in_memory else 0
+        rows = write_embeddings(in_memory, len(keys), dim, models_dir)
+    EmbeddingIndex(model_name, keys, hashes, list(range(rows)), catalog.hexdigest()).save(models_dir)
+    if verbose:
+        print(f'Wrote {rows} embeddings to {os.path.join(models_dir, EMBEDDINGS_FILE)}')
+    return encoded
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Extract text embeddings for the product CSV')
+    parser.add_argument('--data', default=config.DATA_PATH, help='product CSV export')
+    parser.add_argument('--models-dir', default=config.MODELS_DIR)
+    parser.add_argument('--model', default=config.TEXT_MODEL_NAME)
+    parser.add_argument('--workers', type=int, default=config.NUM_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=config.TEXT_BATCH_SIZE)
+    parser.add_argument('--chunk-size', type=int, default=config.CHECKPOINT_FREQUENCY,
+                        help='products per shard')
+    parser.add_argument('--no-checkpoints', action='store_true',
+                        help='do not write shards (no resume)')
+    parser.add_argument('--restart', action='store_true', help='discard existing shards')
+    parser.add_argument('--keep-shards', action='store_true', help='keep shards after merging')
+    parser.add_argument('--full', action='store_true',
+                        help='re-encode every product, even if unchanged')
+    args = parser.parse_args(argv)
+
+    run_pipeline(
+        data_path=args.data,
+        models_dir=args.models_dir,
+        model_name=args.model,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        save_checkpoints=config.SAVE_CHECKPOINTS and not args.no_checkpoints,
+        restart=args.restart,
+        keep_shards=args.keep_shards,
+        incremental=not args.full,
+    )
+
+
+if __name__ == '__main__':
+    main()
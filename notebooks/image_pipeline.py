@@ -0,0 +1,356 @@
+"""
+SmartCart AI - Image Pipeline
+
+Concurrent image download and batched feature extraction, driven by config.py.
+
+ImageFetcher downloads product images with asyncio, with at most
+MAX_CONCURRENT_DOWNLOADS requests in flight and IMAGE_TIMEOUT seconds per
+request. Each image is decoded, resized to IMAGE_SIZE and stored in an
+ImageCache: a directory of uint8 (height, width, 3) arrays named by the
+SHA-256 of the downloaded bytes, plus an index of which URL resolved to
+which image. Cached URLs are never downloaded again, and identical images
+behind different URLs are stored once.
+
+ImageFeatureExtractor reads cached images in IMAGE_BATCH_SIZE batches and
+runs the IMAGE_MODEL_NAME torchvision model (classification head removed).
+The next batch is read from disk while the current one is on the model.
+
+Usage (from notebooks/):
+    python image_pipeline.py [--data PATH] [--concurrency N] [--images-per-product N] [--no-features]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+import config
+from embedding_pipeline import parse_list
+
+IMAGE_FEATURES_FILE = 'image_features.npy'
+URL_INDEX_FILE = 'urls.tsv'
+
+# Statuses worth retrying once the request timed out or the server hiccupped
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ImageNet statistics the torchvision models were trained with
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def decode_image(data: bytes, size: Tuple[int, int] = config.IMAGE_SIZE) -> np.ndarray:
+    """Decode image bytes into a uint8 RGB array resized to size (width, height)"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB').resize(size, Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+
+
+class ImageCache:
+    """
+    Content-addressed store of decoded, resized images.
+
+    Images live at <directory>/<key[:2]>/<key>.npy, where key is the SHA-256
+    of the original image bytes. urls.tsv maps each fetched URL to its key
+    and is only appended to, so an interrupted run keeps what it fetched.
+    """
+
+    def __init__(self, directory: str = config.IMAGE_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, URL_INDEX_FILE)
+        self.urls: Dict[str, str] = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding='utf-8') as f:
+                for line in f:
+                    url, _, key = line.rstrip('\n').partition('\t')
+                    if key and self.contains(key):
+                        self.urls[url] = key
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.npy')
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def key_for(self, url: str) -> Optional[str]:
+        """Cache key of a fetched URL, or None"""
+        return self.urls.get(url)
+
+    def load(self, key: str) -> np.ndarray:
+        return np.load(self.path(key))
+
+    def store(self, data: bytes, image: np.ndarray) -> str:
+        """Store a decoded image under the hash of its original bytes; returns the key"""
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, image)
+            os.replace(path + '.tmp', path)
+        return key
+
+    def record(self, url: str, key: str):
+        """Remember which image a URL resolved to"""
+        self.urls[url] = key
+        with open(self._index_path, 'a', encoding='utf-8') as f:
+            f.write(f'{url}\t{key}\n')
+
+
+class ImageFetcher:
+    """
+    Downloads images into an ImageCache with bounded concurrency.
+
+    A fixed set of worker coroutines pulls URLs from a shared iterator
+    rather than creating one task per URL. Decoding and resizing run in
+    threads, off the event loop.
+    """
+
+    def __init__(self, cache: ImageCache,
+                 concurrency: int = config.MAX_CONCURRENT_DOWNLOADS,
+                 timeout: float = config.IMAGE_TIMEOUT,
+                 size: Tuple[int, int] = config.IMAGE_SIZE,
+                 retries: int = 1,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            cache: Where decoded images are stored
+            concurrency: Requests in flight at once
+            timeout: Seconds per request
+            size: Stored image size (width, height)
+            retries: Extra attempts after a timeout, connection error or 5xx/429
+            transport: httpx transport (e.g. httpx.MockTransport in tests)
+        """
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.size = size
+        self.retries = retries
+        self.transport = transport
+        self.stats = {'cached': 0, 'downloaded': 0, 'failed': 0}
+
+    async def _download(self, client: httpx.AsyncClient, url: str) -> Optional[bytes]:
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.get(url)
+            except httpx.TransportError:
+                # Timeouts and connection errors may pass on another attempt
+                continue
+            except (httpx.HTTPError, httpx.InvalidURL):
+                # Redirect loops, undecodable responses, malformed URLs
+                return None
+            if response.status_code == 200:
+                return response.content
+            if response.status_code not in RETRY_STATUSES:
+                return None
+        return None
+
+    async def _fetch_one(self, client: httpx.AsyncClient, url: str):
+        if self.cache.key_for(url) is not None:
+            self.stats['cached'] += 1
+            return
+        data = await self._download(client, url)
+        if data is None:
+            self.stats['failed'] += 1
+            return
+        try:
+            image = await asyncio.to_thread(decode_image, data, self.size)
+        except Exception:
+            # Not an image the decoder understands (HTML error page, truncated file, ...)
+            self.stats['failed'] += 1
+            return
+        key = await asyncio.to_thread(self.cache.store, data, image)
+        self.cache.record(url, key)
+        self.stats['downloaded'] += 1
+
+    async def fetch_all(self, urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Fetch every URL not yet in the cache
+
+        Returns:
+            Counts of cached, downloaded and failed URLs
+        """
+        pending = iter(dict.fromkeys(urls))
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits,
+                                     follow_redirects=True, transport=self.transport) as client:
+            async def worker():
+                for url in pending:
+                    await self._fetch_one(client, url)
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return dict(self.stats)
+
+    def fetch(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Synchronous wrapper around fetch_all"""
+        return asyncio.run(self.fetch_all(urls))
+
+
+class ImageFeatureExtractor:
+    """
+    Batched image features from cached images with a torchvision model.
+
+    The model is loaded on first use with its default pretrained weights,
+    and its classification head is replaced by an identity, so resnet50
+    gives 2048-dimensional features.
+    """
+
+    def __init__(self, cache: ImageCache,
+                 model_name: str = config.IMAGE_MODEL_NAME,
+                 batch_size: int = config.IMAGE_BATCH_SIZE,
+                 device: Optional[str] = None):
+        self.cache = cache
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+
+    def _load_model(self):
+        import torch
+        import torchvision
+
+        model = torchvision.models.get_model(self.model_name, weights='DEFAULT')
+        for head in ('fc', 'heads', 'classifier'):
+            if hasattr(model, head):
+                setattr(model, head, torch.nn.Identity())
+                break
+        if self.device is None:
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        return model.eval().to(self.device)
+
+    def _load_batch(self, keys: Sequence[str]) -> np.ndarray:
+        """Cached images as a normalized (n, 3, height, width) float32 array"""
+        images = np.stack([self.cache.load(key) for key in keys]).astype(np.float32) / 255.0
+        images = (images - IMAGENET_MEAN) / IMAGENET_STD
+        return np.ascontiguousarray(images.transpose(0, 3, 1, 2))
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        import torch
+
+        with torch.inference_mode():
+            features = self._model(torch.from_numpy(batch).to(self.device))
+        return features.float().cpu().numpy()
+
+    def extract(self, keys: Sequence[str]) -> np.ndarray:
+        """Features of cached images, one row per key, in order"""
+        if self._model is None:
+            self._model = self._load_model()
+        batches = [keys[start:start + self.batch_size]
+                   for start in range(0, len(keys), self.batch_size)]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+
+        features = []
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            next_batch = reader.submit(self._load_batch, batches[0])
+            for index in range(len(batches)):
+                batch = next_batch.result()
+                if index + 1 < len(batches):
+                    next_batch = reader.submit(self._load_batch, batches[index + 1])
+                features.append(self._run(batch))
+        return np.vstack(features)
+
+    def product_features(self, product_keys: Sequence[List[str]]) -> np.ndarray:
+        """
+        Features per product: the mean over its cached images
+
+        Each distinct image is run through the model once; products without
+        any cached image get a zero row.
+        """
+        unique = list(dict.fromkeys(key for keys in product_keys for key in keys))
+        features = self.extract(unique)
+        dim = features.shape[1] if len(unique) else 0
+        position = {key: index for index, key in enumerate(unique)}
+        result = np.zeros((len(product_keys), dim), dtype=np.float32)
+        for row, keys in enumerate(product_keys):
+            if keys:
+                result[row] = features[[position[key] for key in keys]].mean(axis=0)
+        return result
+
+
+def read_image_urls(path: str, images_per_product: int = config.IMAGES_PER_PRODUCT,
+                    chunk_size: int = config.CHECKPOINT_FREQUENCY) -> Iterable[List[List[str]]]:
+    """Image URLs of every product of the CSV (first images_per_product each), in chunks"""
+    for chunk in pd.read_csv(path, usecols=['images'], dtype=str,
+                             keep_default_na=False, chunksize=chunk_size):
+        yield [parse_list(images)[:images_per_product] for images in chunk['images']]
+
+
+def extract_image_features(
+    data_path: str = config.DATA_PATH,
+    models_dir: str = config.MODELS_DIR,
+    cache: Optional[ImageCache] = None,
+    images_per_product: int = config.IMAGES_PER_PRODUCT,
+    chunk_size: int = config.CHECKPOINT_FREQUENCY,
+    extractor: Optional[ImageFeatureExtractor] = None
+) -> int:
+    """
+    Write image_features.npy: one row per CSV product, from cached images
+
+    Products are processed chunk by chunk and written straight into a
+    memory-mapped output file.
+
+    Returns:
+        Number of products
+    """
+    cache = cache or ImageCache()
+    extractor = extractor or ImageFeatureExtractor(cache)
+    n = sum(len(urls) for urls in read_image_urls(data_path, images_per_product, chunk_size))
+    path = os.path.join(models_dir, IMAGE_FEATURES_FILE)
+    output = None
+    start = 0
+    for chunk in read_image_urls(data_path, images_per_product, chunk_size):
+        keys = [[key for key in map(cache.key_for, urls) if key] for urls in chunk]
+        features = extractor.product_features(keys)
+        if output is None and features.shape[1]:
+            output = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=np.float32,
+                                               shape=(n, features.shape[1]))
+        if output is not None and features.shape[1]:
+            output[start:start + len(chunk)] = features
+        start += len(chunk)
+    if output is None:
+        raise ValueError('No product image is cached; run the fetcher first')
+    output.flush()
+    del output
+    os.replace(path + '.tmp', path)
+    return n
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Download product images and extract features')
+    parser.add_argument('--data', default=config.DATA_PATH, help='product CSV export')
+    parser.add_argument('--models-dir', default=config.MODELS_DIR)
+    parser.add_argument('--cache-dir', default=config.IMAGE_CACHE_DIR)
+    parser.add_argument('--concurrency', type=int, default=config.MAX_CONCURRENT_DOWNLOADS)
+    parser.add_argument('--images-per-product', type=int, default=config.IMAGES_PER_PRODUCT)
+    parser.add_argument('--no-features', action='store_true', help='only fill the image cache')
+    args = parser.parse_args(argv)
+
+    cache = ImageCache(args.cache_dir)
+    urls = (url for chunk in read_image_urls(args.data, args.images_per_product)
+            for urls in chunk for url in urls)
+    start = time.perf_counter()
+    stats = ImageFetcher(cache, args.concurrency).fetch(urls)
+    print(f'Images: {stats["downloaded"]} downloaded, {stats["cached"]} already cached, '
+          f'{stats["failed"]} failed in {time.perf_counter() - start:.1f}s')
+
+    if not args.no_features:
+        n = extract_image_features(args.data, args.models_dir, cache, args.images_per_product)
+        print(f'Wrote image features for {n} products to '
+              f'{os.path.join(args.models_dir, IMAGE_FEATURES_FILE)}')
+
+
+if __name__ == '__main__':
+    main()
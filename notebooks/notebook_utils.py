@@ -4,10 +4,12 @@ SmartCart AI - Notebook Helper Utilities
 This module provides helper functions for the model training notebook.
 """
 
+import os
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 from sklearn.metrics import precision_score, recall_score, ndcg_score
+from embedding_pipeline import embeddings_version, params_path, replace_atomically, write_params
 
 
 class RecommendationEvaluator:
@@ -133,16 +135,109 @@ class RecommendationEvaluator:
         Returns:
             Dictionary with all metrics
         """
+        relevant_set = set(relevant)
+        relevance = np.array([[item in relevant_set for item in recommended]], dtype=bool)
+        metrics = self.evaluate_batch(relevance, np.array([len(relevant)]))
+        return {name: float(value) for name, value in metrics.items()}
+
+    @staticmethod
+    def relevance_mask(
+        recommended: np.ndarray,
+        relevant: List[List[Any]],
+        pad_value: Any = -1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build the inputs of evaluate_batch from recommended and relevant IDs
+
+        Args:
+            recommended: (n_queries, n_ranks) recommended item IDs, best first;
+                shorter lists padded with pad_value
+            relevant: Relevant item IDs of every query
+            pad_value: Padding in recommended (never relevant)
+
+        Returns:
+            (relevance mask of shape (n_queries, n_ranks), relevant count per query)
+
+        IDs are compared in a dtype common to both, so string IDs of
+        different lengths only match when equal:
+
+        >>> mask, counts = RecommendationEvaluator.relevance_mask(np.array([['ab', 'cd']]), [['abc', 'cd']])
+        >>> mask.tolist(), counts.tolist()
+        ([[False, True]], [2])
+        """
+        recommended = np.asarray(recommended)
+        n_queries = len(recommended)
+        n_relevant = np.array([len(items) for items in relevant], dtype=np.int64)
+        relevant_ids = np.array([item for items in relevant for item in items])
+        if not len(relevant_ids):
+            relevant_ids = relevant_ids.astype(recommended.dtype)
+
+        # Encode (query, item) pairs as integers and match them all at once
+        codes, inverse = np.unique(
+            np.concatenate([recommended.ravel(), relevant_ids]), return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        recommended_codes = inverse[:recommended.size].reshape(recommended.shape)
+        relevant_codes = inverse[recommended.size:]
+        recommended_pairs = np.arange(n_queries)[:, None] * len(codes) + recommended_codes
+        relevant_pairs = np.repeat(np.arange(n_queries), n_relevant) * len(codes) + relevant_codes
+
+        relevance = np.isin(recommended_pairs, relevant_pairs) & (recommended != pad_value)
+        return relevance, n_relevant
+
+    def evaluate_batch(
+        self,
+        relevance: np.ndarray,
+        n_relevant: np.ndarray,
+        per_query: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate all metrics for many queries in one vectorized pass
+
+        Gives the same values as evaluate_all for every query.
+
+        Args:
+            relevance: (n_queries, n_ranks) bool mask, True where the
+                recommendation at that rank is relevant
+            n_relevant: Number of relevant items per query
+            per_query: Return per-query arrays instead of means
+
+        Returns:
+            Dictionary with precision@k, recall@k and ndcg@k for every k in
+            k_values, and map
+        """
+        relevance = np.asarray(relevance, dtype=bool)
+        n_relevant = np.asarray(n_relevant, dtype=np.float64)
+        n_queries, n_ranks = relevance.shape
+        has_relevant = n_relevant > 0
+        safe_relevant = np.where(has_relevant, n_relevant, 1.0)
+
+        max_k = max(self.k_values, default=0)
+        discounts = 1.0 / np.log2(np.arange(2, max(n_ranks, max_k) + 2))
+        hits = np.cumsum(relevance, axis=1)
+        dcg = np.cumsum(relevance * discounts[:n_ranks], axis=1)
+        # ideal_dcg[m]: DCG of m relevant items at the top
+        ideal_dcg = np.concatenate([[0.0], np.cumsum(discounts)])
+
         metrics = {}
-        
         for k in self.k_values:
-            metrics[f'precision@{k}'] = self.precision_at_k(recommended, relevant, k)
-            metrics[f'recall@{k}'] = self.recall_at_k(recommended, relevant, k)
-            metrics[f'ndcg@{k}'] = self.ndcg_at_k(recommended, relevant, k)
-        
-        metrics['map'] = self.average_precision(recommended, relevant)
-        
-        return metrics
+            if k <= 0 or n_ranks == 0:
+                hits_k = dcg_k = np.zeros(n_queries)
+            else:
+                hits_k = hits[:, min(k, n_ranks) - 1]
+                dcg_k = dcg[:, min(k, n_ranks) - 1]
+            ideal_k = ideal_dcg[np.minimum(n_relevant, max(k, 0)).astype(np.int64)]
+
+            metrics[f'precision@{k}'] = hits_k / k if k > 0 else np.zeros(n_queries)
+            metrics[f'recall@{k}'] = np.where(has_relevant, hits_k / safe_relevant, 0.0)
+            metrics[f'ndcg@{k}'] = np.where(ideal_k > 0, dcg_k / np.where(ideal_k > 0, ideal_k, 1.0), 0.0)
+
+        precision_at_hits = relevance * hits / np.arange(1, n_ranks + 1)
+        metrics['map'] = np.where(has_relevant, precision_at_hits.sum(axis=1) / safe_relevant, 0.0)
+
+        if per_query:
+            return metrics
+        return {name: float(values.mean()) if n_queries else 0.0 for name, values in metrics.items()}
 
 
 class EmbeddingAnalyzer:
@@ -235,6 +330,179 @@ class EmbeddingAnalyzer:
         }
 
 
+class EmbeddingQuantizer:
+    """
+    Quantized (int8 / float16) storage for embedding matrices
+    
+    Rows are L2-normalized before quantization, so quantized scores are
+    cosine similarities. int8 uses one symmetric scale per dimension
+    (row ~= codes * scales). The backend scores the quantized copy first and
+    re-ranks a small candidate set at full precision.
+    """
+    
+    KINDS = ('float16', 'int8')
+    
+    @staticmethod
+    def _unit_rows(embeddings: np.ndarray) -> np.ndarray:
+        rows = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return rows / norms
+    
+    @classmethod
+    def quantize(
+        cls,
+        embeddings: np.ndarray,
+        kind: str,
+        chunk_rows: int = 65536
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize the unit-length rows of an embedding matrix
+        
+        Args:
+            embeddings: Array of embeddings (n_samples, embedding_dim)
+            kind: 'int8' or 'float16'
+            chunk_rows: Rows normalized at a time
+        
+        Returns:
+            (codes, scales): int8 codes with per-dimension float32 scales, or
+            float16 rows with scales None
+        """
+        if kind not in cls.KINDS:
+            raise ValueError(f"Unknown quantization {kind!r}, expected one of {cls.KINDS}")
+        n = len(embeddings)
+        
+        if kind == 'float16':
+            codes = np.empty(embeddings.shape, dtype=np.float16)
+            for start in range(0, n, chunk_rows):
+                codes[start:start + chunk_rows] = cls._unit_rows(embeddings[start:start + chunk_rows])
+            return codes, None
+        
+        # First pass: largest magnitude per dimension
+        max_abs = np.zeros(embeddings.shape[1], dtype=np.float32)
+        for start in range(0, n, chunk_rows):
+            chunk = cls._unit_rows(embeddings[start:start + chunk_rows])
+            np.maximum(max_abs, np.abs(chunk).max(axis=0), out=max_abs)
+        scales = max_abs / 127.0
+        scales[scales == 0] = 1.0
+        
+        codes = np.empty(embeddings.shape, dtype=np.int8)
+        for start in range(0, n, chunk_rows):
+            chunk = cls._unit_rows(embeddings[start:start + chunk_rows])
+            codes[start:start + chunk_rows] = np.clip(np.rint(chunk / scales), -127, 127)
+        return codes, scales.astype(np.float32)
+    
+    @classmethod
+    def save(
+        cls,
+        embeddings: np.ndarray,
+        embeddings_path: str,
+        kind: str,
+        version: Optional[str] = None
+    ) -> List[str]:
+        """
+        Write the quantized copy of an embeddings file next to it
+        
+        The content version of the embeddings is recorded in a .json file
+        with the copy; the backend ignores copies whose version no longer
+        matches. Each file is written to a temporary name and renamed into
+        place, so a server with the previous copy mapped keeps reading it.
+        
+        Args:
+            embeddings: Array of embeddings
+            embeddings_path: Path of the float32 .npy file (e.g. text_embeddings.npy)
+            kind: 'int8' or 'float16'
+            version: Content version of the embeddings (default: the one
+                recorded for embeddings_path, see embedding_pipeline)
+        
+        Returns:
+            Paths written
+        """
+        if version is None:
+            version = embeddings_version(os.path.dirname(embeddings_path) or '.',
+                                         os.path.basename(embeddings_path))
+        codes, scales = cls.quantize(embeddings, kind)
+        stem = embeddings_path[:-len('.npy')] if embeddings_path.endswith('.npy') else embeddings_path
+        paths = [f"{stem}.{kind}.npy"]
+        replace_atomically(paths[0], lambda f: np.save(f, codes))
+        if scales is not None:
+            paths.append(f"{stem}.{kind}_scales.npy")
+            replace_atomically(paths[1], lambda f: np.save(f, scales))
+        paths.append(params_path(paths[0]))
+        write_params(paths[-1], {'embeddings_version': version})
+        return paths
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indexes of the k highest scores in each row (unordered)"""
+        k = min(k, scores.shape[1])
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    
+    @classmethod
+    def evaluate(
+        cls,
+        embeddings: np.ndarray,
+        kinds: Tuple[str, ...] = KINDS,
+        k: int = 10,
+        n_queries: int = 200,
+        rerank_candidates: int = 200,
+        seed: int = 42
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Measure memory savings and retrieval accuracy of quantized storage
+        
+        Stored products are used as queries. Recall@k is measured against
+        exact float32 cosine search, both for the quantized scores alone and
+        after re-ranking the top `rerank_candidates` at full precision.
+        
+        Args:
+            embeddings: Array of embeddings (n_samples, embedding_dim)
+            kinds: Quantization kinds to evaluate
+            k: Number of neighbors compared
+            n_queries: Number of query products
+            rerank_candidates: Candidates re-ranked at full precision
+            seed: Random seed for the query sample
+        
+        Returns:
+            Per kind: float32_mb, quantized_mb, savings_pct, recall@k,
+            recall@k_reranked and recall_loss (1 - recall after re-ranking)
+        """
+        unit = cls._unit_rows(embeddings)
+        rng = np.random.default_rng(seed)
+        queries = unit[rng.choice(len(unit), size=min(n_queries, len(unit)), replace=False)]
+        exact_scores = queries @ unit.T
+        exact = cls._top_k(exact_scores, k)
+        
+        def recall(found: np.ndarray) -> float:
+            return float(np.mean([
+                len(np.intersect1d(row_found, row_exact)) / len(row_exact)
+                for row_found, row_exact in zip(found, exact)
+            ]))
+        
+        float32_bytes = unit.nbytes
+        report = {}
+        for kind in kinds:
+            codes, scales = cls.quantize(embeddings, kind)
+            weighted = queries if scales is None else queries * scales
+            approximate_scores = weighted @ codes.astype(np.float32).T
+            
+            candidates = cls._top_k(approximate_scores, max(k, rerank_candidates))
+            reranked_scores = np.take_along_axis(exact_scores, candidates, axis=1)
+            reranked = np.take_along_axis(candidates, cls._top_k(reranked_scores, k), axis=1)
+            
+            quantized_bytes = codes.nbytes + (0 if scales is None else scales.nbytes)
+            reranked_recall = recall(reranked)
+            report[kind] = {
+                'float32_mb': float32_bytes / 1024 / 1024,
+                'quantized_mb': quantized_bytes / 1024 / 1024,
+                'savings_pct': (1 - quantized_bytes / float32_bytes) * 100,
+                f'recall@{k}': recall(cls._top_k(approximate_scores, k)),
+                f'recall@{k}_reranked': reranked_recall,
+                'recall_loss': 1 - reranked_recall
+            }
+        return report
+
+
 class DataValidator:
     """Validate data quality before training"""
     
@@ -345,7 +613,8 @@ class DataValidator:
 def print_training_summary(
     model_config: Dict[str, Any],
     embeddings_info: Dict[str, Tuple[str, np.ndarray]],
-    evaluation_metrics: Dict[str, Any] = None
+    evaluation_metrics: Dict[str, Any] = None,
+    quantization_report: Dict[str, Dict[str, float]] = None
 ) -> None:
     """
     Print a comprehensive training summary
@@ -354,6 +623,7 @@ def print_training_summary(
         model_config: Model configuration dictionary
         embeddings_info: Dictionary mapping embedding names to (path, array) tuples
         evaluation_metrics: Optional evaluation metrics
+        quantization_report: Optional EmbeddingQuantizer.evaluate() results
     """
     print("\n" + "=" * 80)
     print(" " * 25 + "TRAINING SUMMARY")
@@ -382,4 +652,16 @@ def print_training_summary(
             else:
                 print(f"  {metric}: {value}")
     
+    if quantization_report:
+        print("\n🗜️ Quantized Storage:")
+        print("-" * 80)
+        for kind, stats in quantization_report.items():
+            recalls = {metric: value for metric, value in stats.items() if metric.startswith('recall@')}
+            print(f"  {kind}:")
+            print(f"    - Size: {stats['quantized_mb']:.2f} MB "
+                  f"(float32 {stats['float32_mb']:.2f} MB, {stats['savings_pct']:.1f}% saved)")
+            for metric, value in recalls.items():
+                print(f"    - {metric}: {value:.4f}")
+            print(f"    - Recall loss after re-ranking: {stats['recall_loss']:.4f}")
+    
     print("\n" + "=" * 80 + "\n")
@@ -0,0 +1,66 @@
+import io
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from image_pipeline import ImageCache, ImageFetcher
+
+BASE = 'http://images.test'
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (200, 30, 30)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+PNG = png_bytes()
+
+
+def handler(requests):
+    """Mock server: records every request path"""
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == '/ok.png':
+            return httpx.Response(200, content=PNG)
+        if request.url.path == '/missing.png':
+            return httpx.Response(404)
+        if request.url.path == '/slow.png':
+            raise httpx.ReadTimeout('timed out', request=request)
+        if request.url.path == '/loop.png':
+            return httpx.Response(302, headers={'Location': f'{BASE}/loop.png'})
+        return httpx.Response(500)
+    return handle
+
+
+def fetcher(cache, requests) -> ImageFetcher:
+    return ImageFetcher(cache, concurrency=2, size=(4, 4),
+                        transport=httpx.MockTransport(handler(requests)))
+
+
+def test_fetch_counts_successes_and_failures(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    requests = []
+    urls = [f'{BASE}/ok.png', f'{BASE}/missing.png', f'{BASE}/slow.png', f'{BASE}/loop.png',
+            'http://[invalid']
+
+    stats = fetcher(cache, requests).fetch(urls)
+
+    assert stats == {'cached': 0, 'downloaded': 1, 'failed': 4}
+    key = cache.key_for(f'{BASE}/ok.png')
+    assert cache.load(key).shape == (4, 4, 3)
+    assert cache.load(key).dtype == np.uint8
+    # A timeout is retried once, a 404 is not
+    assert requests.count('/slow.png') == 2
+    assert requests.count('/missing.png') == 1
+
+
+def test_rerun_uses_cache(tmp_path):
+    fetcher(ImageCache(str(tmp_path)), []).fetch([f'{BASE}/ok.png'])
+
+    requests = []
+    stats = fetcher(ImageCache(str(tmp_path)), requests).fetch([f'{BASE}/ok.png', f'{BASE}/missing.png'])
+
+    assert stats == {'cached': 1, 'downloaded': 0, 'failed': 1}
+    assert requests == ['/missing.png']